@@ -4,24 +4,876 @@
 """
 
 import aiosqlite
+import asyncio
+import contextvars
+import os
+import shutil
+import zlib
+from collections import namedtuple
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from contextlib import asynccontextmanager
 from astrbot.api import logger
 
+# utils 包需先于 spirit_root 导入（utils.calculator 会反向导入 spirit_root）
+from ..utils.constants import INITIAL_COMBAT_STATS, REALMS, REALM_ORDER
+from ..utils.location_constants import INITIAL_LOCATION_ROWS
+from .spirit_root import SpiritRootFactory
+
+
+def _build_realm_bonus_table() -> Dict[str, Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+    """
+    预计算各境界的属性加成
+
+    Returns:
+        境界名 -> (之前所有境界的完整加成累计, 本境界加成)，
+        加成元组顺序为 (max_hp, max_mp, attack, defense)
+    """
+    keys = ('max_hp', 'max_mp', 'attack', 'defense')
+    table = {}
+    cumulative = (0, 0, 0, 0)
+    for realm_name in sorted(REALM_ORDER, key=lambda name: REALMS[name]['index']):
+        attribute_bonus = REALMS[realm_name].get('attribute_bonus', {})
+        bonus = tuple(attribute_bonus.get(key, 0) for key in keys)
+        table[realm_name] = (cumulative, bonus)
+        # 大境界突破：获得完整的境界属性加成 * 4（因为有4个小境界）
+        cumulative = tuple(c + b * 4 for c, b in zip(cumulative, bonus))
+    return table
+
+
+_REALM_BONUS_TABLE = _build_realm_bonus_table()
+
+
+def _realm_level_bonus(realm: str, realm_level: int) -> Tuple[int, ...]:
+    """
+    计算某境界某小境界的境界属性加成总和
+
+    Args:
+        realm: 境界名
+        realm_level: 小境界（1-4）
+
+    Returns:
+        (max_hp, max_mp, attack, defense) 加成
+    """
+    prior_bonus, realm_bonus = _REALM_BONUS_TABLE[realm]
+    # 小境界提升：每级25%的境界属性加成
+    level_factor = 0.25 * realm_level
+    return tuple(p + int(b * level_factor) for p, b in zip(prior_bonus, realm_bonus))
+
+
+# (境界, 小境界) -> 境界属性加成总和；对常规小境界 0-4 预先展开
+_REALM_LEVEL_BONUS: Dict[Tuple[str, int], Tuple[int, ...]] = {
+    (realm, level): _realm_level_bonus(realm, level)
+    for realm in _REALM_BONUS_TABLE
+    for level in range(5)
+}
+
+# 属性修复只需要的玩家列；直接按列构造轻量元组，不经过 Player 对象
+_PLAYER_ATTR_COLUMNS: Tuple[str, ...] = (
+    "user_id", "name", "realm", "realm_level",
+    "spirit_root_type", "spirit_root_quality", "spirit_root_value", "spirit_root_purity",
+    "constitution", "spiritual_power", "comprehension", "luck", "root_bone",
+    "max_hp", "max_mp", "attack", "defense",
+)
+_PlayerAttrs = namedtuple("_PlayerAttrs", _PLAYER_ATTR_COLUMNS)
+# 按主键分页（keyset），避免一次性把整张玩家表读入内存
+_SELECT_PLAYER_ATTRS_PAGE_SQL = (
+    f"SELECT {', '.join(_PLAYER_ATTR_COLUMNS)} FROM players "
+    "WHERE user_id > ? ORDER BY user_id LIMIT ?"
+)
+_FIX_ATTRIBUTES_BATCH_SIZE = 1000
+_UPDATE_PLAYER_ATTRS_SQL = """
+    UPDATE players
+    SET max_hp = ?, hp = ?, max_mp = ?, mp = ?,
+        attack = ?, defense = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE user_id = ?
+"""
+
+# 所有表的名称与列定义（按创建顺序）
+_TABLE_SCHEMAS: Tuple[Tuple[str, str], ...] = (
+    # 玩家表
+    ("players", """
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    realm TEXT DEFAULT '炼气期',
+    realm_level INTEGER DEFAULT 1,
+    cultivation INTEGER DEFAULT 0,
+
+    spirit_root_type TEXT,
+    spirit_root_quality TEXT,
+    spirit_root_value INTEGER DEFAULT 50,
+    spirit_root_purity INTEGER DEFAULT 50,
+
+    constitution INTEGER DEFAULT 10,
+    spiritual_power INTEGER DEFAULT 10,
+    comprehension INTEGER DEFAULT 10,
+    luck INTEGER DEFAULT 10,
+    root_bone INTEGER DEFAULT 10,
+
+    hp INTEGER DEFAULT 100,
+    max_hp INTEGER DEFAULT 100,
+    mp INTEGER DEFAULT 100,
+    max_mp INTEGER DEFAULT 100,
+    attack INTEGER DEFAULT 10,
+    defense INTEGER DEFAULT 10,
+
+    spirit_stone INTEGER DEFAULT 1000,
+    contribution INTEGER DEFAULT 0,
+
+    sect_id INTEGER,
+    sect_position TEXT,
+
+    current_location TEXT DEFAULT '新手村',
+
+    last_cultivation TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    in_retreat INTEGER DEFAULT 0,
+    retreat_start TIMESTAMP,
+    retreat_duration INTEGER DEFAULT 0,
+
+    first_nascent_breakthrough INTEGER DEFAULT 0
+"""),
+
+    # 装备表
+    ("equipment", """
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        sub_type TEXT,
+        quality TEXT NOT NULL,
+        level INTEGER NOT NULL,
+        enhance_level INTEGER DEFAULT 0,
+        attack INTEGER DEFAULT 0,
+        defense INTEGER DEFAULT 0,
+        hp_bonus INTEGER DEFAULT 0,
+        mp_bonus INTEGER DEFAULT 0,
+        extra_attrs TEXT,
+        special_effect TEXT,
+        skill_id INTEGER,
+        is_equipped INTEGER DEFAULT 0,
+        is_bound INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 技能表
+    ("skills", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        skill_name TEXT NOT NULL,
+        skill_type TEXT,
+        element TEXT,
+        level INTEGER DEFAULT 1,
+        proficiency INTEGER DEFAULT 0,
+        base_damage INTEGER DEFAULT 0,
+        mp_cost INTEGER DEFAULT 10,
+        cooldown INTEGER DEFAULT 0,
+        effect_description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 职业信息表
+    ("professions", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        profession_type TEXT NOT NULL,
+        rank INTEGER DEFAULT 1,
+        experience INTEGER DEFAULT 0,
+        reputation INTEGER DEFAULT 0,
+        reputation_level TEXT DEFAULT '无名小卒',
+        success_rate_bonus INTEGER DEFAULT 0,
+        quality_bonus INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 配方/图纸/阵法/符箓表
+    ("recipes", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        recipe_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        rank INTEGER DEFAULT 1,
+        description TEXT,
+        materials TEXT,
+        output_name TEXT,
+        output_quality TEXT,
+        base_success_rate INTEGER DEFAULT 50,
+        special_requirements TEXT,
+        source TEXT,
+        is_ai_generated BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 炼制记录表
+    ("crafting_logs", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        craft_type TEXT NOT NULL,
+        recipe_id INTEGER,
+        success BOOLEAN DEFAULT 0,
+        output_quality TEXT,
+        output_item_id INTEGER,
+        materials_used TEXT,
+        spirit_stone_cost INTEGER DEFAULT 0,
+        experience_gained INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 工具表（丹炉、器炉等）
+    ("tools", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        tool_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        quality TEXT DEFAULT '凡品',
+        success_rate_bonus INTEGER DEFAULT 0,
+        quality_bonus INTEGER DEFAULT 0,
+        special_effects TEXT,
+        durability INTEGER DEFAULT 100,
+        max_durability INTEGER DEFAULT 100,
+        is_active BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 职业技能表
+    ("profession_skills", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        profession_type TEXT NOT NULL,
+        skill_name TEXT NOT NULL,
+        skill_level INTEGER DEFAULT 1,
+        effect_type TEXT,
+        effect_value INTEGER DEFAULT 0,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 活跃阵法表
+    ("active_formations", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        formation_name TEXT NOT NULL,
+        location_id INTEGER,
+        formation_type TEXT,
+        strength INTEGER DEFAULT 1,
+        range INTEGER DEFAULT 10,
+        effects TEXT,
+        energy_cost INTEGER DEFAULT 10,
+        is_active BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP
+    """),
+
+    # 物品表 (用于存储符箓等消耗品)
+    ("items", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        item_type TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        quality TEXT,
+        quantity INTEGER DEFAULT 1,
+        description TEXT,
+        effect TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 功法表
+    ("cultivation_methods", """
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        description TEXT,
+        method_type TEXT NOT NULL,
+        element_type TEXT NOT NULL,
+        cultivation_type TEXT NOT NULL,
+        quality TEXT NOT NULL,
+        grade INTEGER NOT NULL,
+        min_realm TEXT NOT NULL,
+        min_realm_level INTEGER NOT NULL,
+        min_level INTEGER NOT NULL,
+        attack_bonus INTEGER DEFAULT 0,
+        defense_bonus INTEGER DEFAULT 0,
+        speed_bonus INTEGER DEFAULT 0,
+        hp_bonus INTEGER DEFAULT 0,
+        mp_bonus INTEGER DEFAULT 0,
+        cultivation_speed_bonus REAL DEFAULT 0.0,
+        breakthrough_rate_bonus REAL DEFAULT 0.0,
+        special_effects TEXT,
+        skill_damage INTEGER DEFAULT 0,
+        cooldown_reduction REAL DEFAULT 0.0,
+        owner_id TEXT,
+        is_equipped INTEGER DEFAULT 0,
+        equip_slot TEXT,
+        proficiency INTEGER DEFAULT 0,
+        max_proficiency INTEGER DEFAULT 1000,
+        mastery_level INTEGER DEFAULT 0,
+        source_type TEXT,
+        source_detail TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        equipped_at TIMESTAMP,
+        last_practiced_at TIMESTAMP
+    """),
+
+    # 宗门表
+    ("sects", """
+        id TEXT PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL,
+        description TEXT,
+        announcement TEXT,
+        sect_type TEXT NOT NULL,
+        sect_style TEXT NOT NULL,
+        level INTEGER DEFAULT 1,
+        experience INTEGER DEFAULT 0,
+        max_experience INTEGER DEFAULT 1000,
+        spirit_stone INTEGER DEFAULT 0,
+        contribution INTEGER DEFAULT 0,
+        reputation INTEGER DEFAULT 0,
+        power INTEGER DEFAULT 0,
+        leader_id TEXT NOT NULL,
+        member_count INTEGER DEFAULT 0,
+        max_members INTEGER DEFAULT 20,
+        buildings TEXT,
+        sect_skills TEXT,
+        is_recruiting INTEGER DEFAULT 1,
+        join_requirement TEXT,
+        in_war INTEGER DEFAULT 0,
+        war_target_id TEXT,
+        war_score INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_active_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 宗门成员表
+    ("sect_members", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT UNIQUE NOT NULL,
+        sect_id TEXT NOT NULL,
+        position TEXT NOT NULL,
+        position_level INTEGER NOT NULL,
+        contribution INTEGER DEFAULT 0,
+        total_contribution INTEGER DEFAULT 0,
+        activity INTEGER DEFAULT 0,
+        last_active_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # AI生成历史表
+    ("ai_generation_history", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        content_type TEXT NOT NULL,
+        content_id TEXT NOT NULL,
+        generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 天劫表
+    ("tribulations", """
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        tribulation_type TEXT NOT NULL,
+        realm TEXT NOT NULL,
+        realm_level INTEGER NOT NULL,
+        tribulation_level INTEGER NOT NULL,
+        difficulty TEXT NOT NULL,
+        total_waves INTEGER NOT NULL,
+        current_wave INTEGER DEFAULT 0,
+        damage_per_wave INTEGER NOT NULL,
+        damage_reduction REAL DEFAULT 0.0,
+        status TEXT NOT NULL,
+        success INTEGER DEFAULT 0,
+        initial_hp INTEGER DEFAULT 0,
+        current_hp INTEGER DEFAULT 0,
+        total_damage_taken INTEGER DEFAULT 0,
+        rewards TEXT,
+        penalties TEXT,
+        wave_logs TEXT,
+        started_at TEXT,
+        completed_at TEXT,
+        created_at TEXT NOT NULL
+    """),
+
+    # 职业考核表
+    ("profession_exams", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        profession_type TEXT NOT NULL,
+        target_rank INTEGER NOT NULL,
+        exam_title TEXT NOT NULL,
+        tasks TEXT,
+        results TEXT,
+        status TEXT DEFAULT 'in_progress',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at TIMESTAMP
+    """),
+
+    # 地点表
+    ("locations", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        description TEXT NOT NULL,
+        region_type TEXT NOT NULL,
+        danger_level INTEGER DEFAULT 1,
+        spirit_energy_density INTEGER DEFAULT 50,
+        min_realm TEXT DEFAULT '炼气期',
+        coordinates_x INTEGER DEFAULT 0,
+        coordinates_y INTEGER DEFAULT 0,
+        resources TEXT,
+        connected_locations TEXT,
+        is_safe_zone INTEGER DEFAULT 0,
+        discovered_by TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 玩家位置表
+    ("player_locations", """
+        user_id TEXT PRIMARY KEY,
+        current_location_id INTEGER NOT NULL,
+        last_move_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        total_moves INTEGER DEFAULT 0,
+        total_exploration_score INTEGER DEFAULT 0
+    """),
+
+    # 玩家功法表
+    ("player_cultivation_methods", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        method_id TEXT NOT NULL,
+        is_main INTEGER DEFAULT 0,
+        proficiency INTEGER DEFAULT 0,
+        proficiency_stage TEXT DEFAULT '初窥门径',
+        compatibility INTEGER DEFAULT 50,
+        learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_practice TIMESTAMP
+    """),
+
+    # 功法技能关联表
+    ("method_skills", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        method_id TEXT NOT NULL,
+        skill_name TEXT NOT NULL,
+        skill_type TEXT,
+        unlock_proficiency INTEGER DEFAULT 0,
+        element TEXT,
+        mp_cost INTEGER DEFAULT 10,
+        cooldown INTEGER DEFAULT 0,
+        base_damage INTEGER DEFAULT 0,
+        effect_description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 坊市物品表
+    ("market_items", """
+        id TEXT PRIMARY KEY,
+        seller_id TEXT NOT NULL,
+        item_type TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        quality TEXT,
+        description TEXT,
+        price INTEGER NOT NULL,
+        quantity INTEGER DEFAULT 1,
+        attributes TEXT,
+        status TEXT DEFAULT 'active',
+        listed_at TEXT NOT NULL,
+        created_at TEXT,
+        sold_at TEXT
+    """),
+
+    # 坊市交易记录表
+    ("market_transactions", """
+        id TEXT PRIMARY KEY,
+        listing_id TEXT NOT NULL,
+        seller_id TEXT NOT NULL,
+        buyer_id TEXT NOT NULL,
+        item_type TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        price INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        tax INTEGER DEFAULT 0,
+        transaction_time TEXT NOT NULL
+    """),
+
+    # ===== 灵宠系统表 =====
+    # 灵宠模板表
+    ("pets", """
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        pet_type TEXT NOT NULL,
+        rarity TEXT NOT NULL,
+        description TEXT,
+        base_attributes TEXT NOT NULL,
+        growth_rate REAL DEFAULT 1.0,
+        max_level INTEGER DEFAULT 50,
+        element TEXT,
+        evolution_to INTEGER,
+        capture_difficulty INTEGER DEFAULT 50,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 玩家灵宠表
+    ("player_pets", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        pet_id INTEGER NOT NULL,
+        pet_name TEXT NOT NULL,
+        level INTEGER DEFAULT 1,
+        experience INTEGER DEFAULT 0,
+        is_active INTEGER DEFAULT 0,
+        intimacy INTEGER DEFAULT 0,
+        battle_count INTEGER DEFAULT 0,
+        acquired_from TEXT NOT NULL,
+        acquired_at TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 灵宠秘境记录表
+    ("pet_secret_realms", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT UNIQUE NOT NULL,
+        realm_level INTEGER DEFAULT 1,
+        exploration_count INTEGER DEFAULT 0,
+        last_exploration_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 灵脉表
+    ("spirit_veins", """
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        level INTEGER NOT NULL,
+        location TEXT NOT NULL,
+        base_income INTEGER NOT NULL,
+        owner_id TEXT,
+        owner_name TEXT,
+        occupied_at TIMESTAMP,
+        last_collect_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 探索故事历史表
+    ("exploration_stories", """
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        location_id INTEGER NOT NULL,
+        story_type TEXT NOT NULL,
+        story_title TEXT NOT NULL,
+        story_content TEXT NOT NULL,
+        choices TEXT,
+        has_choice INTEGER DEFAULT 0,
+        selected_choice TEXT,
+        outcome TEXT,
+        rewards TEXT,
+        consequences TEXT,
+        is_completed INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at TIMESTAMP
+    """),
+
+    # 玩家故事状态表（用于跨多次探索的连续剧情）
+    ("player_story_states", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        story_arc_id TEXT NOT NULL,
+        current_chapter INTEGER DEFAULT 1,
+        total_chapters INTEGER DEFAULT 1,
+        state_data TEXT,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, story_arc_id)
+    """),
+
+    # 探索后果记录表（记录玩家选择的长期影响）
+    ("exploration_consequences", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        story_id TEXT NOT NULL,
+        consequence_type TEXT NOT NULL,
+        consequence_value TEXT NOT NULL,
+        expires_at TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+
+    # 玩家状态表（重伤、中毒等临时状态）
+    ("player_status", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        status_type TEXT NOT NULL,
+        status_data TEXT,
+        severity INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL
+    """),
+
+    # 探索队伍表
+    ("exploration_teams", """
+        id TEXT PRIMARY KEY,
+        leader_id TEXT NOT NULL,
+        location_id INTEGER NOT NULL,
+        status TEXT DEFAULT 'waiting',
+        session_data TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+    """),
+
+    # 队伍成员表
+    ("team_members", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        status TEXT DEFAULT 'invited',
+        joined_at TIMESTAMP,
+        expires_at INTEGER,
+        UNIQUE(team_id, user_id)
+    """),
+
+    # 已执行的一次性数据迁移记录
+    ("schema_migrations", """
+        id TEXT PRIMARY KEY,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """),
+)
+
+
+def _parse_schema_columns(schema: str) -> List[str]:
+    """
+    解析schema中的列定义（正确处理括号内的逗号）
+
+    表级约束（ALTER TABLE ADD COLUMN不支持添加约束）会被跳过
+
+    Args:
+        schema: 表的列定义字符串
+
+    Returns:
+        列定义列表
+    """
+    columns = []
+    current_parts = []
+    paren_count = 0
+
+    for part in schema.split(','):
+        current_parts.append(part)
+        paren_count += part.count('(') - part.count(')')
+
+        if paren_count == 0:
+            # 括号匹配，这是一个完整的列定义或约束
+            full_column = ','.join(current_parts).strip()
+            if full_column:
+                columns.append(full_column)
+            current_parts = []
+
+    # 处理剩余部分（如果有）
+    if current_parts:
+        full_column = ','.join(current_parts).strip()
+        if full_column:
+            columns.append(full_column)
+
+    constraint_keywords = ['UNIQUE(', 'PRIMARY', 'FOREIGN', 'CHECK(', 'CONSTRAINT']
+    return [
+        column for column in columns
+        if not any(
+            column.upper().startswith(kw) or column.upper().startswith(kw.replace('(', ' ('))
+            for kw in constraint_keywords
+        )
+    ]
+
+
+def _build_declared_columns() -> Dict[str, Dict[str, Tuple[str, str]]]:
+    """
+    解析所有声明的表结构（导入时执行一次）
+
+    Returns:
+        {表名: {列名: (大写声明类型, 完整列定义)}}，列按声明顺序排列
+    """
+    declared = {}
+    for table_name, schema in _TABLE_SCHEMAS:
+        columns = {}
+        for column in _parse_schema_columns(schema):
+            parts = column.split()
+            columns[parts[0]] = (parts[1].upper() if len(parts) > 1 else "", column)
+        declared[table_name] = columns
+    return declared
+
+
+_DECLARED_COLUMNS = _build_declared_columns()
+
+# 二级索引（在数据加载完成后统一创建）
+_INDEXES: Tuple[str, ...] = (
+    "CREATE INDEX IF NOT EXISTS idx_players_realm ON players(realm)",
+    # 背包按时间倒序列出；已穿戴装备按槽位（类型）定位
+    "CREATE INDEX IF NOT EXISTS idx_equipment_user_created ON equipment(user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_equipment_slot ON equipment(user_id, is_equipped, type)",
+    "CREATE INDEX IF NOT EXISTS idx_skills_user ON skills(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_professions_user ON professions(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_recipes_type ON recipes(recipe_type)",
+    "CREATE INDEX IF NOT EXISTS idx_items_user ON items(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_items_type ON items(user_id, item_type)",
+    "CREATE INDEX IF NOT EXISTS idx_cultivation_methods_user ON cultivation_methods(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_cultivation_methods_equipped ON cultivation_methods(user_id, is_equipped)",
+    "CREATE INDEX IF NOT EXISTS idx_sect_members_sect ON sect_members(sect_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sect_members_user ON sect_members(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_tribulations_user ON tribulations(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_tribulations_status ON tribulations(user_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_active_formations_user ON active_formations(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_active_formations_location ON active_formations(location_id, is_active)",
+    "CREATE INDEX IF NOT EXISTS idx_player_pets_user ON player_pets(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_player_pets_active ON player_pets(user_id, is_active)",
+    "CREATE INDEX IF NOT EXISTS idx_pet_secret_realms_user ON pet_secret_realms(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_spirit_veins_owner ON spirit_veins(owner_id)",
+    "CREATE INDEX IF NOT EXISTS idx_spirit_veins_level ON spirit_veins(level)",
+    "CREATE INDEX IF NOT EXISTS idx_locations_region ON locations(region_type)",
+    "CREATE INDEX IF NOT EXISTS idx_locations_danger ON locations(danger_level)",
+    "CREATE INDEX IF NOT EXISTS idx_player_locations_user ON player_locations(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_player_locations_location ON player_locations(current_location_id)",
+    "CREATE INDEX IF NOT EXISTS idx_player_cultivation_methods_user ON player_cultivation_methods(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_player_cultivation_methods_method ON player_cultivation_methods(method_id)",
+    "CREATE INDEX IF NOT EXISTS idx_player_cultivation_methods_main ON player_cultivation_methods(user_id, is_main)",
+    "CREATE INDEX IF NOT EXISTS idx_method_skills_method ON method_skills(method_id)",
+    "CREATE INDEX IF NOT EXISTS idx_market_items_type ON market_items(item_type, status)",
+    "CREATE INDEX IF NOT EXISTS idx_market_items_seller ON market_items(seller_id)",
+    "CREATE INDEX IF NOT EXISTS idx_market_transactions_buyer ON market_transactions(buyer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_market_transactions_seller ON market_transactions(seller_id)",
+    "CREATE INDEX IF NOT EXISTS idx_exploration_stories_user ON exploration_stories(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_exploration_stories_location ON exploration_stories(location_id)",
+    "CREATE INDEX IF NOT EXISTS idx_exploration_stories_completed ON exploration_stories(user_id, is_completed)",
+    "CREATE INDEX IF NOT EXISTS idx_player_story_states_user ON player_story_states(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_exploration_consequences_user ON exploration_consequences(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_exploration_consequences_story ON exploration_consequences(story_id)",
+    # 玩家收到的邀请/所在队伍按 (user_id, status) 查；队伍成员按状态过滤后按加入时间排序
+    "CREATE INDEX IF NOT EXISTS idx_team_members_user ON team_members(user_id, status)",
+    "CREATE INDEX IF NOT EXISTS idx_team_members_team_status ON team_members(team_id, status, joined_at)",
+    # 只索引邀请状态的行，清理过期邀请时按 expires_at 范围删除
+    "CREATE INDEX IF NOT EXISTS idx_team_members_invite_expiry ON team_members(expires_at) WHERE status = 'invited'",
+)
+
+# 已被上面更宽的索引取代的旧索引（其列是新索引的前缀），建索引时一并删除以免多余的写入开销
+_DROPPED_INDEXES: Tuple[str, ...] = (
+    "DROP INDEX IF EXISTS idx_equipment_user",
+    "DROP INDEX IF EXISTS idx_equipment_equipped",
+)
+
+# 预先拼接好的索引脚本：单个事务内建全部索引并 ANALYZE，只需一次线程往返
+_INDEX_SCRIPT = "BEGIN;\n" + ";\n".join(_DROPPED_INDEXES + _INDEXES) + ";\nANALYZE;\nCOMMIT;"
+
+# 表结构版本：由声明的表结构和索引计算，初始化完成后写入 PRAGMA user_version；
+# 与库中记录一致时启动跳过表结构检查、迁移和建索引（0 保留给从未初始化过的库）
+_SCHEMA_VERSION = (
+    zlib.crc32(
+        "\n".join(
+            [f"{name}:{schema}" for name, schema in _TABLE_SCHEMAS]
+            + list(_DROPPED_INDEXES) + list(_INDEXES)
+        ).encode("utf-8")
+    ) & 0x7FFFFFFF
+) or 1
+
+# 种子数据版本：地点列表变化后会再执行一次种子步骤，补上新增的地点
+_LOCATION_SEED_ID = "seed_initial_locations:%08x" % zlib.crc32(repr(INITIAL_LOCATION_ROWS).encode("utf-8"))
+
+# 装备附加属性早期以 Python 字典字面量（单引号）存储，统一改写为 JSON，以便 SQL 中用 json_extract 读取
+# （char(39) 为单引号，char(34) 为双引号）
+_NORMALIZE_EQUIPMENT_EXTRA_ATTRS_SQL = """
+    UPDATE equipment SET extra_attrs = replace(extra_attrs, char(39), char(34))
+    WHERE extra_attrs IS NOT NULL
+      AND NOT json_valid(extra_attrs)
+      AND json_valid(replace(extra_attrs, char(39), char(34)))
+"""
+
+# 队伍邀请改为在库中记录过期时间之前遗留的邀请没有 expires_at，且早已超过 30 秒有效期，直接删除
+_DELETE_LEGACY_TEAM_INVITES_SQL = """
+    DELETE FROM team_members
+    WHERE status = 'invited' AND expires_at IS NULL
+"""
+
+# 地点名唯一：已存在的地点由 SQLite 的唯一约束直接跳过
+_INSERT_LOCATION_SQL = """
+    INSERT OR IGNORE INTO locations (
+        name, description, region_type, danger_level,
+        spirit_energy_density, min_realm, coordinates_x, coordinates_y,
+        is_safe_zone, connected_locations
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# 新建数据库使用的页大小（字节）
+_PAGE_SIZE = 8192
+
+# 每轮定期维护最多回收的空闲页数
+_INCREMENTAL_VACUUM_PAGES = 1000
+
+# 检查点后 WAL 文件保留的最大字节数
+_JOURNAL_SIZE_LIMIT = 10 * 1024 * 1024
+
+# 定期维护脚本：被动检查点、增量回收空闲页、按需更新统计信息
+_MAINTENANCE_SCRIPT = (
+    "PRAGMA wal_checkpoint(PASSIVE);\n"
+    f"PRAGMA incremental_vacuum({_INCREMENTAL_VACUUM_PAGES});\n"
+    "PRAGMA optimize;"
+)
+
+# 会改变表结构的语句前缀（取前 6 个字符比较），用于让表结构缓存失效
+_DDL_PREFIXES = frozenset({"CREATE", "ALTER ", "DROP T"})
+
+# transaction() 支持的事务类型
+_TRANSACTION_MODES = frozenset({"DEFERRED", "IMMEDIATE", "EXCLUSIVE"})
+
+# get_table_info 返回的列信息字段（按 PRAGMA table_info 的列顺序显式投影）
+_TABLE_INFO_KEYS: Tuple[str, ...] = ("cid", "name", "type", "notnull", "dflt_value", "pk")
+_TABLE_NAMES_SQL = "SELECT name FROM sqlite_master WHERE type='table'"
+_TABLE_INFO_SQL = 'SELECT cid, name, type, "notnull", dflt_value, pk FROM pragma_table_info(?)'
+
+# 每个连接缓存的已编译语句数量（sqlite3 按 SQL 文本做 LRU，命中时只重新绑定参数）
+_STATEMENT_CACHE_SIZE = 256
+
+# 每个连接建立后执行的性能参数（读写连接通用）
+_CONNECTION_PRAGMAS: Tuple[str, ...] = (
+    "PRAGMA synchronous=NORMAL",     # WAL 下只在检查点时 fsync，提交不再逐次刷盘
+    "PRAGMA temp_store=MEMORY",      # 排序/临时表放在内存中
+    "PRAGMA cache_size=-64000",      # 约 64MB 页缓存
+    "PRAGMA mmap_size=268435456",    # 256MB 内存映射读
+    "PRAGMA busy_timeout=5000",      # 遇到锁时最多等待 5 秒而不是立即报错
+)
+
+# 只追加写入的日志类表：只允许 ADD COLUMN 迁移，列变化不会触发迁移前快照
+_APPEND_ONLY_TABLES = frozenset({
+    "crafting_logs", "ai_generation_history", "market_transactions",
+    "exploration_stories", "exploration_consequences",
+})
+
 
 class DatabaseManager:
     """数据库管理器"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, reader_count: Optional[int] = None,
+                 maintenance_interval: float = 600):
         """
         初始化数据库管理器
 
         Args:
             db_path: 数据库文件路径
+            reader_count: 只读连接数量（默认 min(8, CPU 核数)，0 表示所有查询都走写连接）
+            maintenance_interval: 后台检查点间隔（秒，0 表示不启用）
         """
         self.db_path = Path(db_path)
-        self.db: Optional[aiosqlite.Connection] = None
+        self.db: Optional[aiosqlite.Connection] = None  # 唯一的写连接
+        if reader_count is None:
+            reader_count = min(8, os.cpu_count() or 1)
+        self.reader_count = reader_count
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_conns: List[aiosqlite.Connection] = []
+        self._wal_enabled = False
+        # 写连接只有一个：最外层事务和事务外的每次写入都持有此锁，
+        # 其他任务的写入不会混进正在进行的事务，也不会被它的回滚带走
+        self._write_lock = asyncio.Lock()
+        # transaction() 的嵌套层数按任务（上下文）记录，只有持有事务的任务才会嵌套使用保存点
+        self._tx_depth: contextvars.ContextVar[int] = contextvars.ContextVar(
+            f"xiuxian_tx_depth_{id(self)}", default=0
+        )
+        self.maintenance_interval = maintenance_interval
+        self._maintenance_task: Optional[asyncio.Task] = None
+        # 表结构缓存：表结构只在 DDL 后变化，执行 DDL 时整体失效
+        self._table_info_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._existing_tables: set = set()
 
     async def init_db(self):
         """初始化数据库连接并创建表"""
@@ -30,31 +882,72 @@ class DatabaseManager:
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
             # 建立连接
-            self.db = await aiosqlite.connect(str(self.db_path))
-            self.db.row_factory = aiosqlite.Row  # 使结果可以通过列名访问
+            await self._connect()
 
             logger.info(f"数据库连接成功: {self.db_path}")
 
-            # 备份现有数据
-            await self._backup_existing_data()
-
-            # 创建表结构（不删除现有表，只创建新表和添加新字段）
-            await self._create_or_update_tables()
+            # 表结构阶段只按位置读取元数据，临时改用元组行以省去 Row 对象开销
+            row_factory = self.db.row_factory
+            self.db.row_factory = None
+            try:
+                schema_current = await self._get_user_version() == _SCHEMA_VERSION
+                if schema_current:
+                    # 表结构与索引都与声明一致：热启动不做任何表结构写入
+                    logger.info("数据库表结构已是最新版本")
+                elif await self._schema_needs_rebuild():
+                    # 有列被删除或改变类型：迁移前整库快照，迁移失败时还原
+                    await self._backup_existing_data()
+                    try:
+                        await self._migrate_in_place()
+                    except Exception:
+                        await self._restore_backup_data()
+                        raise
+                    # 表已整体重建，顺便把旧库的页大小和空闲页回收方式统一到新库的设置
+                    await self._rebuild_file_layout()
+                    # 迁移成功，快照是整库副本，不再保留
+                    self._discard_snapshot()
+                else:
+                    # 只有新增表/新增列，无需备份，直接原地迁移
+                    await self._migrate_in_place()
+            finally:
+                self.db.row_factory = row_factory
+
+            # 一次性数据迁移：已执行过的步骤在热启动时直接跳过
+            applied = await self._load_applied_migrations()
 
-            # 还原备份数据
-            await self._restore_backup_data()
+            # 初始化基础地点数据
+            await self._run_once(applied, _LOCATION_SEED_ID, self._seed_initial_locations)
 
-            # 创建索引
-            await self._create_indexes()
+            # 装备附加属性改为 JSON 存储
+            await self._run_once(
+                applied, "equipment_extra_attrs_json", self._normalize_equipment_extra_attrs
+            )
 
-            # 初始化基础地点数据
-            await self._seed_initial_locations()
+            # 清理没有过期时间的旧队伍邀请
+            await self._run_once(
+                applied, "team_invite_expires_at", self._delete_legacy_team_invites
+            )
 
             # [已禁用] 修复现有玩家的属性
             # 注意：此功能会重新计算玩家属性，但只考虑基础属性、灵根和境界加成
             # 不包括装备、丹药、功法、buff等其他加成，会导致玩家属性被错误降低
             # 如果需要修复属性异常，请使用专门的修复工具或命令
-            # await self._fix_player_attributes()
+            # await self._run_once(applied, "fix_player_attributes", self._fix_player_attributes)
+
+            if not schema_current:
+                # 数据就绪后再创建索引并收集统计信息，全部完成后才记录版本
+                await self._create_indexes()
+                await self._run_pragma(self.db, f"PRAGMA user_version={_SCHEMA_VERSION}")
+            else:
+                # 热启动：只为统计信息可能过期的表重新分析（0x10002 = 打开连接时的推荐掩码）
+                await self._run_pragma(self.db, "PRAGMA optimize=0x10002")
+
+            # 表结构稳定后再打开只读连接
+            await self._open_readers()
+
+            # 定期检查点，避免长时间运行时 WAL 文件无限增长
+            if self._wal_enabled and self.maintenance_interval > 0:
+                self._maintenance_task = asyncio.create_task(self._periodic_maintenance())
 
             logger.info("数据库初始化完成")
 
@@ -62,932 +955,410 @@ class DatabaseManager:
             logger.error(f"数据库初始化失败: {e}", exc_info=True)
             raise
 
-    async def _backup_existing_data(self):
-        """备份现有数据"""
-        if not await self.table_exists("players"):
-            logger.info("数据库为空，无需备份")
+    async def _connect(self):
+        """建立写连接并启用 WAL 模式"""
+        # 连接前判断是否为新库：页大小只能在写入第一页之前设置
+        is_new = not self.db_path.exists() or self.db_path.stat().st_size == 0
+
+        # isolation_level=None：关闭 sqlite3 模块的隐式 BEGIN，单条写语句由 SQLite 自动提交，
+        # 多条语句的事务一律显式 BEGIN / COMMIT
+        self.db = await aiosqlite.connect(
+            str(self.db_path), isolation_level=None,
+            cached_statements=_STATEMENT_CACHE_SIZE
+        )
+        self.db.row_factory = aiosqlite.Row  # 使结果可以通过列名访问
+
+        if is_new:
+            # 新库使用 8KB 页，减少 TEXT 较多的行占用的 B 树页数；
+            # 必须在切换 WAL（会写入库头）之前执行
+            await self._run_pragma(self.db, f"PRAGMA page_size={_PAGE_SIZE}")
+            # 增量回收空闲页，日常维护无需整库 VACUUM
+            await self._run_pragma(self.db, "PRAGMA auto_vacuum=INCREMENTAL")
+
+        # WAL 模式下只读连接与唯一的写连接互不阻塞
+        cursor = await self.db.execute("PRAGMA journal_mode=WAL")
+        row = await cursor.fetchone()
+        await cursor.close()
+        self._wal_enabled = row is not None and str(row[0]).lower() == "wal"
+
+        # 检查点后把 WAL 文件截断到上限以内
+        await self._run_pragma(self.db, f"PRAGMA journal_size_limit={_JOURNAL_SIZE_LIMIT}")
+        await self._apply_connection_pragmas(self.db)
+
+    async def _rebuild_file_layout(self):
+        """
+        将旧库的页大小与 auto_vacuum 模式改为新库的设置
+
+        两者在已有数据的库上只能通过 VACUUM 生效，而 WAL 模式下无法修改页大小，
+        因此临时切回 DELETE 日志模式。仅在表结构重建时调用，此时只读连接尚未打开。
+        """
+        cursor = await self.db.execute("PRAGMA page_size")
+        page_size = (await cursor.fetchone())[0]
+        await cursor.close()
+        cursor = await self.db.execute("PRAGMA auto_vacuum")
+        auto_vacuum = (await cursor.fetchone())[0]
+        await cursor.close()
+        # auto_vacuum: 2 = INCREMENTAL
+        if page_size == _PAGE_SIZE and auto_vacuum == 2:
             return
 
-        logger.info("开始备份现有数据...")
-        
-        # 备份所有表的数据
-        tables_to_backup = [
-            "players", "equipment", "skills", "professions", "recipes",
-            "crafting_logs", "tools", "profession_skills", "active_formations",
-            "items", "sects", "sect_members", "ai_generation_history",
-            "tribulations", "profession_exams", "locations", "player_locations",
-            "cultivation_methods", "player_cultivation_methods", "method_skills",
-            "market_items", "market_transactions",
-            "pets", "player_pets", "pet_secret_realms", "spirit_veins"
-        ]
-        
-        for table in tables_to_backup:
-            if await self.table_exists(table):
-                try:
-                    await self.execute(f"DROP TABLE IF EXISTS {table}_backup")
-                    await self.execute(f"CREATE TABLE {table}_backup AS SELECT * FROM {table}")
-                    logger.info(f"已备份表: {table}")
-                except Exception as e:
-                    logger.error(f"备份表 {table} 失败: {e}")
-            else:
-                logger.debug(f"表 {table} 不存在，跳过备份")
-        
+        logger.info(f"重建数据库文件: 页大小 {page_size} -> {_PAGE_SIZE}")
+        await self._run_pragma(self.db, "PRAGMA journal_mode=DELETE")
+        try:
+            await self._run_pragma(self.db, f"PRAGMA page_size={_PAGE_SIZE}")
+            await self._run_pragma(self.db, "PRAGMA auto_vacuum=INCREMENTAL")
+            await self.db.execute("VACUUM")
+        except Exception as e:
+            # 文件布局只影响性能，失败时保留原布局继续启动
+            logger.warning(f"重建数据库文件失败，保留原页大小: {e}")
+        finally:
+            cursor = await self.db.execute("PRAGMA journal_mode=WAL")
+            row = await cursor.fetchone()
+            await cursor.close()
+            self._wal_enabled = row is not None and str(row[0]).lower() == "wal"
+
+    @staticmethod
+    async def _run_pragma(conn: aiosqlite.Connection, sql: str):
+        """执行 PRAGMA 并立即关闭游标（有返回行的 PRAGMA 不关闭会一直占用语句）"""
+        cursor = await conn.execute(sql)
+        await cursor.close()
+
+    @classmethod
+    async def _apply_connection_pragmas(cls, conn: aiosqlite.Connection):
+        """为连接设置通用性能参数（设置失败时保持默认值，不影响使用）"""
+        for pragma in _CONNECTION_PRAGMAS:
+            try:
+                await cls._run_pragma(conn, pragma)
+            except Exception as e:
+                logger.warning(f"设置 {pragma} 失败，保持默认值: {e}")
+
+    async def _periodic_maintenance(self):
+        """后台任务：定期执行被动检查点、增量回收空闲页并更新查询规划统计"""
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            try:
+                # 三步合并为一个脚本，一次线程往返；incremental_vacuum 每步回收一页，
+                # 也需要用 executescript 才能执行到结束（非增量模式的库上为空操作）；
+                # 持有写锁，等正在进行的事务结束后再执行
+                async with self._write_lock:
+                    await self.db.executescript(_MAINTENANCE_SCRIPT)
+            except aiosqlite.OperationalError as e:
+                if "locked" not in str(e):
+                    logger.warning(f"数据库定期维护失败: {e}")
+                else:
+                    # 与刚提交的写入交错，下一轮重试即可
+                    logger.debug(f"数据库定期维护跳过: {e}")
+            except Exception as e:
+                logger.warning(f"数据库定期维护失败: {e}")
+
+    async def _open_readers(self):
+        """打开只读连接池（仅在 WAL 模式下启用）"""
+        if self.reader_count <= 0:
+            return
+        if not self._wal_enabled:
+            logger.warning("数据库未处于 WAL 模式，查询将使用写连接")
+            return
+
+        uri = self.db_path.resolve().as_uri() + "?mode=ro"
+        readers: asyncio.Queue = asyncio.Queue()
+        try:
+            for _ in range(self.reader_count):
+                conn = await aiosqlite.connect(
+                    uri, uri=True, cached_statements=_STATEMENT_CACHE_SIZE
+                )
+                conn.row_factory = aiosqlite.Row
+                await self._apply_connection_pragmas(conn)
+                # 双重保险：即使以只读方式打开，也在连接级拒绝任何写入
+                await self._run_pragma(conn, "PRAGMA query_only=1")
+                self._reader_conns.append(conn)
+                readers.put_nowait(conn)
+        except Exception as e:
+            logger.warning(f"打开只读连接失败，查询将使用写连接: {e}")
+            await self._close_readers()
+            return
+
+        self._readers = readers
+        logger.info(f"已打开 {self.reader_count} 个只读连接")
+
+    async def _close_readers(self):
+        """关闭只读连接池"""
+        self._readers = None
+        for conn in self._reader_conns:
+            await conn.close()
+        self._reader_conns = []
+
+    @asynccontextmanager
+    async def reader(self):
+        """
+        获取一个只读连接
+
+        当前任务处于事务中时返回写连接，保证能读到本事务内的修改；
+        未启用只读连接池时持有写锁使用写连接，不会读到其他任务未提交的事务
+
+        使用方式:
+            async with db.reader() as conn:
+                cursor = await conn.execute(...)
+        """
+        if self._in_transaction:
+            yield self.db
+            return
+        if self._readers is None:
+            async with self._write_lock:
+                yield self.db
+            return
+
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    def _snapshot_path(self) -> Path:
+        """迁移前快照文件路径"""
+        return self.db_path.with_name(self.db_path.name + ".premigration.bak")
+
+    async def _backup_existing_data(self):
+        """使用 SQLite 在线备份 API 将整个数据库快照到旁路文件"""
+        snapshot_path = self._snapshot_path()
+        logger.info(f"开始备份现有数据: {snapshot_path}")
+
+        dest = await aiosqlite.connect(str(snapshot_path))
+        try:
+            await self.db.backup(dest)
+        finally:
+            await dest.close()
+
+        # 备份不应让 WAL 持续膨胀
+        await self._run_pragma(self.db, "PRAGMA wal_checkpoint(TRUNCATE)")
         logger.info("数据备份完成")
 
+    def _discard_snapshot(self):
+        """迁移成功后删除迁移前快照"""
+        snapshot_path = self._snapshot_path()
+        try:
+            snapshot_path.unlink(missing_ok=True)
+            logger.info(f"迁移完成，已删除迁移前快照: {snapshot_path}")
+        except OSError as e:
+            logger.warning(f"删除迁移前快照失败，可手动删除 {snapshot_path}: {e}")
+
     async def _restore_backup_data(self):
-        """还原备份数据"""
-        logger.info("开始还原备份数据...")
-        
-        # 还原所有表的数据
-        tables_to_restore = [
-            "players", "equipment", "skills", "professions", "recipes",
-            "crafting_logs", "tools", "profession_skills", "active_formations",
-            "items", "sects", "sect_members", "ai_generation_history",
-            "tribulations", "profession_exams", "locations", "player_locations",
-            "cultivation_methods", "player_cultivation_methods", "method_skills",
-            "market_items", "market_transactions",
-            "pets", "player_pets", "pet_secret_realms", "spirit_veins"
+        """迁移失败时用快照覆盖数据库文件并重新连接"""
+        snapshot_path = self._snapshot_path()
+        logger.warning(f"开始从快照还原数据库: {snapshot_path}")
+
+        row_factory = self.db.row_factory
+        await self.db.close()
+        shutil.copyfile(snapshot_path, self.db_path)
+
+        await self._connect()
+        self.db.row_factory = row_factory
+        self._invalidate_schema_cache()
+        # 迁移失败时保留快照，便于排查；下次迁移前会被覆盖
+        logger.info(f"数据库已从快照还原，快照保留在: {snapshot_path}")
+
+    async def _load_table_columns(self) -> Dict[str, Dict[str, str]]:
+        """
+        一次查询读取所有表的列信息
+
+        Returns:
+            {表名: {列名: 声明类型}}
+        """
+        columns_by_table: Dict[str, Dict[str, str]] = {}
+        async with self.reader() as conn:
+            async with conn.execute("""
+                SELECT m.name AS tbl, p.name AS col, p.type AS col_type
+                FROM sqlite_master m JOIN pragma_table_info(m.name) p
+                WHERE m.type = 'table'
+            """) as cursor:
+                # 逐行写入字典，不先物化完整的结果列表
+                async for row in cursor:
+                    columns_by_table.setdefault(row[0], {})[row[1]] = row[2] or ""
+        return columns_by_table
+
+    def _plan_table_ddl(
+        self,
+        table_name: str,
+        schema: str,
+        columns_by_table: Dict[str, Dict[str, str]]
+    ) -> List[str]:
+        """
+        生成让表结构与声明一致所需的DDL：表不存在则建表，存在则补齐缺失的列
+
+        Args:
+            table_name: 表名
+            schema: 声明的列定义
+            columns_by_table: 现有表的列信息
+
+        Returns:
+            DDL 语句列表（无需变更时为空）
+        """
+        existing_columns = columns_by_table.get(table_name)
+        if existing_columns is None:
+            return [f"CREATE TABLE {table_name} ({schema})"]
+
+        return [
+            f"ALTER TABLE {table_name} ADD COLUMN {column}"
+            for column_name, (_, column) in _DECLARED_COLUMNS[table_name].items()
+            if column_name not in existing_columns
         ]
-        
-        for table in tables_to_restore:
-            if await self.table_exists(f"{table}_backup"):
-                try:
-                    logger.info(f"开始还原表: {table}")
-                    # 清空目标表
-                    await self.execute(f"DELETE FROM {table}")
-                    logger.info(f"已清空表: {table}")
-
-                    # 获取备份表的列信息
-                    backup_columns = await self.fetchall(f"PRAGMA table_info({table}_backup)")
-                    backup_column_names = [col[1] for col in backup_columns]
-                    logger.info(f"备份表 {table}_backup 列: {backup_column_names}")
-
-                    # 获取目标表的列信息
-                    target_columns = await self.fetchall(f"PRAGMA table_info({table})")
-                    target_column_names = [col[1] for col in target_columns]
-                    logger.info(f"目标表 {table} 列: {target_column_names}")
-
-                    # 确定共同的列
-                    common_columns = [col for col in backup_column_names if col in target_column_names]
-
-                    if common_columns:
-                        # 只还原共同的列
-                        columns_str = ", ".join(common_columns)
-                        logger.info(f"还原表 {table} 的共同列: {columns_str}")
-                        await self.execute(f"INSERT INTO {table} ({columns_str}) SELECT {columns_str} FROM {table}_backup")
-                        logger.info(f"✓ 已还原表: {table}")
-                    else:
-                        logger.warning(f"表 {table} 没有共同列，跳过还原")
-                except Exception as e:
-                    logger.error(f"还原表 {table} 失败: {e}", exc_info=True)
 
-  
-        # 删除备份表
-        for table in tables_to_restore:
-            await self.execute(f"DROP TABLE IF EXISTS {table}_backup")
-        logger.info("备份表清理完成")
+    async def _schema_needs_rebuild(self) -> bool:
+        """
+        预检表结构变更（只读取表结构信息，不做任何修改）
 
-    async def _ensure_table_exists(self, table_name: str, schema: str):
-        """确保表存在，如果不存在则创建，如果存在则添加缺失的列"""
-        try:
-            logger.info(f"正在处理表: {table_name}")
-            cursor = await self.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            existing_tables = [row[0] for row in await cursor.fetchall()]
-
-            if table_name not in existing_tables:
-                # 表不存在，直接创建
-                create_sql = f"CREATE TABLE {table_name} ({schema})"
-                await self.execute(create_sql)
-                logger.info(f"创建表: {table_name}")
-            else:
-                # 表已存在，检查并添加缺失的列
-                await self._add_missing_columns(table_name, schema)
-                logger.info(f"更新表结构: {table_name}")
-            logger.info(f"✓ 表 {table_name} 处理完成")
-        except Exception as e:
-            logger.error(f"处理表 {table_name} 时出错: {e}", exc_info=True)
-            raise
+        新增表和新增列都可以通过 CREATE TABLE / ALTER TABLE ADD COLUMN 原地完成，
+        只有现有列被删除或改变类型时才需要先做整库快照（日志类表除外）
 
-    async def _add_missing_columns(self, table_name: str, schema: str):
-        """为现有表添加缺失的列"""
+        Returns:
+            是否需要在迁移前备份
+        """
+        columns_by_table = await self._load_table_columns()
+        if "players" not in columns_by_table:
+            return False
+
+        for table_name, declared in _DECLARED_COLUMNS.items():
+            if table_name in _APPEND_ONLY_TABLES:
+                continue
+            existing = columns_by_table.get(table_name)
+            if not existing:
+                continue
+
+            for name, col_type in existing.items():
+                col_type = col_type.upper()
+                if name not in declared:
+                    logger.info(f"表 {table_name} 的列 {name} 已从表结构中移除")
+                    return True
+                declared_type = declared[name][0]
+                if declared_type != col_type:
+                    logger.info(f"表 {table_name} 的列 {name} 类型变更: {col_type} -> {declared_type}")
+                    return True
+
+        return False
+
+    async def _get_user_version(self) -> int:
+        """读取库中记录的表结构版本"""
+        cursor = await self.db.execute("PRAGMA user_version")
+        row = await cursor.fetchone()
+        await cursor.close()
+        return row[0] if row else 0
+
+    async def _migrate_in_place(self):
+        """在单个 IMMEDIATE 事务内原地创建新表、添加新列"""
         try:
-            logger.info(f"检查表 {table_name} 的列...")
-            # 获取现有表的列信息
-            cursor = await self.execute(f"PRAGMA table_info({table_name})")
-            existing_columns = {row[1] for row in await cursor.fetchall()}
-            logger.info(f"表 {table_name} 现有列: {existing_columns}")
-
-            # 解析新schema中的列定义（正确处理括号内的逗号）
-            columns = []
-            current_parts = []
-            paren_count = 0
-
-            for part in schema.split(','):
-                current_parts.append(part)
-                paren_count += part.count('(') - part.count(')')
-
-                if paren_count == 0:
-                    # 括号匹配，这是一个完整的列定义或约束
-                    full_column = ','.join(current_parts).strip()
-                    if full_column:
-                        columns.append(full_column)
-                    current_parts = []
-
-            # 处理剩余部分（如果有）
-            if current_parts:
-                full_column = ','.join(current_parts).strip()
-                if full_column:
-                    columns.append(full_column)
-
-            for column in columns:
-                # 跳过表级约束（ALTER TABLE ADD COLUMN不支持添加约束）
-                constraint_keywords = ['UNIQUE(', 'PRIMARY', 'FOREIGN', 'CHECK(', 'CONSTRAINT']
-                if any(column.upper().startswith(kw) or column.upper().startswith(kw.replace('(', ' (')) for kw in constraint_keywords):
-                    logger.info(f"跳过表级约束: {column[:50]}...")
-                    continue
-
-                # 提取列名（第一个词）
-                column_name = column.split()[0]
-
-                if column_name not in existing_columns:
-                    # 添加缺失的列
-                    logger.info(f"为表 {table_name} 添加新列: {column_name}")
-                    alter_sql = f"ALTER TABLE {table_name} ADD COLUMN {column}"
-                    await self.execute(alter_sql)
-                    logger.info(f"✓ 为表 {table_name} 添加列成功: {column_name}")
-
-            logger.info(f"✓ 表 {table_name} 列检查完成")
-        except Exception as e:
-            logger.error(f"为表 {table_name} 添加列时出错: {e}", exc_info=True)
+            await self._create_or_update_tables()
+        except Exception:
+            # 脚本中途失败时事务仍处于打开状态
+            if self.db.in_transaction:
+                await self.db.rollback()
             raise
+        finally:
+            self._invalidate_schema_cache()
 
     async def _create_or_update_tables(self):
         """创建或更新所有表结构（保持现有数据）"""
         try:
-            logger.info("开始创建或更新数据库表结构...")
-
-            # 获取现有表列表
-            existing_tables = []
-            cursor = await self.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            rows = await cursor.fetchall()
-            existing_tables = [row[0] for row in rows]
-            logger.info(f"现有表: {existing_tables}")
-
-            # 玩家表
-            await self._ensure_table_exists("players", """
-            user_id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            realm TEXT DEFAULT '炼气期',
-            realm_level INTEGER DEFAULT 1,
-            cultivation INTEGER DEFAULT 0,
-
-            spirit_root_type TEXT,
-            spirit_root_quality TEXT,
-            spirit_root_value INTEGER DEFAULT 50,
-            spirit_root_purity INTEGER DEFAULT 50,
-
-            constitution INTEGER DEFAULT 10,
-            spiritual_power INTEGER DEFAULT 10,
-            comprehension INTEGER DEFAULT 10,
-            luck INTEGER DEFAULT 10,
-            root_bone INTEGER DEFAULT 10,
-
-            hp INTEGER DEFAULT 100,
-            max_hp INTEGER DEFAULT 100,
-            mp INTEGER DEFAULT 100,
-            max_mp INTEGER DEFAULT 100,
-            attack INTEGER DEFAULT 10,
-            defense INTEGER DEFAULT 10,
-
-            spirit_stone INTEGER DEFAULT 1000,
-            contribution INTEGER DEFAULT 0,
-
-            sect_id INTEGER,
-            sect_position TEXT,
-
-            current_location TEXT DEFAULT '新手村',
-
-            last_cultivation TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-
-            in_retreat INTEGER DEFAULT 0,
-            retreat_start TIMESTAMP,
-            retreat_duration INTEGER DEFAULT 0,
-
-            first_nascent_breakthrough INTEGER DEFAULT 0
-        """)
-
-            # 装备表
-            await self._ensure_table_exists("equipment", """
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                type TEXT NOT NULL,
-                sub_type TEXT,
-                quality TEXT NOT NULL,
-                level INTEGER NOT NULL,
-                enhance_level INTEGER DEFAULT 0,
-                attack INTEGER DEFAULT 0,
-                defense INTEGER DEFAULT 0,
-                hp_bonus INTEGER DEFAULT 0,
-                mp_bonus INTEGER DEFAULT 0,
-                extra_attrs TEXT,
-                special_effect TEXT,
-                skill_id INTEGER,
-                is_equipped INTEGER DEFAULT 0,
-                is_bound INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 技能表
-            await self._ensure_table_exists("skills", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                skill_name TEXT NOT NULL,
-                skill_type TEXT,
-                element TEXT,
-                level INTEGER DEFAULT 1,
-                proficiency INTEGER DEFAULT 0,
-                base_damage INTEGER DEFAULT 0,
-                mp_cost INTEGER DEFAULT 10,
-                cooldown INTEGER DEFAULT 0,
-                effect_description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 职业信息表
-            await self._ensure_table_exists("professions", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                profession_type TEXT NOT NULL,
-                rank INTEGER DEFAULT 1,
-                experience INTEGER DEFAULT 0,
-                reputation INTEGER DEFAULT 0,
-                reputation_level TEXT DEFAULT '无名小卒',
-                success_rate_bonus INTEGER DEFAULT 0,
-                quality_bonus INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 配方/图纸/阵法/符箓表
-            await self._ensure_table_exists("recipes", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                recipe_type TEXT NOT NULL,
-                name TEXT NOT NULL,
-                rank INTEGER DEFAULT 1,
-                description TEXT,
-                materials TEXT,
-                output_name TEXT,
-                output_quality TEXT,
-                base_success_rate INTEGER DEFAULT 50,
-                special_requirements TEXT,
-                source TEXT,
-                is_ai_generated BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 炼制记录表
-            await self._ensure_table_exists("crafting_logs", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                craft_type TEXT NOT NULL,
-                recipe_id INTEGER,
-                success BOOLEAN DEFAULT 0,
-                output_quality TEXT,
-                output_item_id INTEGER,
-                materials_used TEXT,
-                spirit_stone_cost INTEGER DEFAULT 0,
-                experience_gained INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 工具表（丹炉、器炉等）
-            await self._ensure_table_exists("tools", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                tool_type TEXT NOT NULL,
-                name TEXT NOT NULL,
-                quality TEXT DEFAULT '凡品',
-                success_rate_bonus INTEGER DEFAULT 0,
-                quality_bonus INTEGER DEFAULT 0,
-                special_effects TEXT,
-                durability INTEGER DEFAULT 100,
-                max_durability INTEGER DEFAULT 100,
-                is_active BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 职业技能表
-            await self._ensure_table_exists("profession_skills", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                profession_type TEXT NOT NULL,
-                skill_name TEXT NOT NULL,
-                skill_level INTEGER DEFAULT 1,
-                effect_type TEXT,
-                effect_value INTEGER DEFAULT 0,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 活跃阵法表
-            await self._ensure_table_exists("active_formations", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                formation_name TEXT NOT NULL,
-                location_id INTEGER,
-                formation_type TEXT,
-                strength INTEGER DEFAULT 1,
-                range INTEGER DEFAULT 10,
-                effects TEXT,
-                energy_cost INTEGER DEFAULT 10,
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP
-            """)
-
-            # 物品表 (用于存储符箓等消耗品)
-            await self._ensure_table_exists("items", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                item_type TEXT NOT NULL,
-                item_name TEXT NOT NULL,
-                quality TEXT,
-                quantity INTEGER DEFAULT 1,
-                description TEXT,
-                effect TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 功法表
-            await self._ensure_table_exists("cultivation_methods", """
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                description TEXT,
-                method_type TEXT NOT NULL,
-                element_type TEXT NOT NULL,
-                cultivation_type TEXT NOT NULL,
-                quality TEXT NOT NULL,
-                grade INTEGER NOT NULL,
-                min_realm TEXT NOT NULL,
-                min_realm_level INTEGER NOT NULL,
-                min_level INTEGER NOT NULL,
-                attack_bonus INTEGER DEFAULT 0,
-                defense_bonus INTEGER DEFAULT 0,
-                speed_bonus INTEGER DEFAULT 0,
-                hp_bonus INTEGER DEFAULT 0,
-                mp_bonus INTEGER DEFAULT 0,
-                cultivation_speed_bonus REAL DEFAULT 0.0,
-                breakthrough_rate_bonus REAL DEFAULT 0.0,
-                special_effects TEXT,
-                skill_damage INTEGER DEFAULT 0,
-                cooldown_reduction REAL DEFAULT 0.0,
-                owner_id TEXT,
-                is_equipped INTEGER DEFAULT 0,
-                equip_slot TEXT,
-                proficiency INTEGER DEFAULT 0,
-                max_proficiency INTEGER DEFAULT 1000,
-                mastery_level INTEGER DEFAULT 0,
-                source_type TEXT,
-                source_detail TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                equipped_at TIMESTAMP,
-                last_practiced_at TIMESTAMP
-            """)
-
-            # 宗门表
-            await self._ensure_table_exists("sects", """
-                id TEXT PRIMARY KEY,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                announcement TEXT,
-                sect_type TEXT NOT NULL,
-                sect_style TEXT NOT NULL,
-                level INTEGER DEFAULT 1,
-                experience INTEGER DEFAULT 0,
-                max_experience INTEGER DEFAULT 1000,
-                spirit_stone INTEGER DEFAULT 0,
-                contribution INTEGER DEFAULT 0,
-                reputation INTEGER DEFAULT 0,
-                power INTEGER DEFAULT 0,
-                leader_id TEXT NOT NULL,
-                member_count INTEGER DEFAULT 0,
-                max_members INTEGER DEFAULT 20,
-                buildings TEXT,
-                sect_skills TEXT,
-                is_recruiting INTEGER DEFAULT 1,
-                join_requirement TEXT,
-                in_war INTEGER DEFAULT 0,
-                war_target_id TEXT,
-                war_score INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_active_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 宗门成员表
-            await self._ensure_table_exists("sect_members", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT UNIQUE NOT NULL,
-                sect_id TEXT NOT NULL,
-                position TEXT NOT NULL,
-                position_level INTEGER NOT NULL,
-                contribution INTEGER DEFAULT 0,
-                total_contribution INTEGER DEFAULT 0,
-                activity INTEGER DEFAULT 0,
-                last_active_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # AI生成历史表
-            await self._ensure_table_exists("ai_generation_history", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                content_type TEXT NOT NULL,
-                content_id TEXT NOT NULL,
-                generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 天劫表
-            await self._ensure_table_exists("tribulations", """
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                tribulation_type TEXT NOT NULL,
-                realm TEXT NOT NULL,
-                realm_level INTEGER NOT NULL,
-                tribulation_level INTEGER NOT NULL,
-                difficulty TEXT NOT NULL,
-                total_waves INTEGER NOT NULL,
-                current_wave INTEGER DEFAULT 0,
-                damage_per_wave INTEGER NOT NULL,
-                damage_reduction REAL DEFAULT 0.0,
-                status TEXT NOT NULL,
-                success INTEGER DEFAULT 0,
-                initial_hp INTEGER DEFAULT 0,
-                current_hp INTEGER DEFAULT 0,
-                total_damage_taken INTEGER DEFAULT 0,
-                rewards TEXT,
-                penalties TEXT,
-                wave_logs TEXT,
-                started_at TEXT,
-                completed_at TEXT,
-                created_at TEXT NOT NULL
-            """)
-
-            # 职业考核表
-            await self._ensure_table_exists("profession_exams", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                profession_type TEXT NOT NULL,
-                target_rank INTEGER NOT NULL,
-                exam_title TEXT NOT NULL,
-                tasks TEXT,
-                results TEXT,
-                status TEXT DEFAULT 'in_progress',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP
-            """)
-
-            # 地点表
-            await self._ensure_table_exists("locations", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                description TEXT NOT NULL,
-                region_type TEXT NOT NULL,
-                danger_level INTEGER DEFAULT 1,
-                spirit_energy_density INTEGER DEFAULT 50,
-                min_realm TEXT DEFAULT '炼气期',
-                coordinates_x INTEGER DEFAULT 0,
-                coordinates_y INTEGER DEFAULT 0,
-                resources TEXT,
-                connected_locations TEXT,
-                is_safe_zone INTEGER DEFAULT 0,
-                discovered_by TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 玩家位置表
-            await self._ensure_table_exists("player_locations", """
-                user_id TEXT PRIMARY KEY,
-                current_location_id INTEGER NOT NULL,
-                last_move_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_moves INTEGER DEFAULT 0,
-                total_exploration_score INTEGER DEFAULT 0
-            """)
-
-            # 玩家功法表
-            await self._ensure_table_exists("player_cultivation_methods", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                method_id TEXT NOT NULL,
-                is_main INTEGER DEFAULT 0,
-                proficiency INTEGER DEFAULT 0,
-                proficiency_stage TEXT DEFAULT '初窥门径',
-                compatibility INTEGER DEFAULT 50,
-                learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_practice TIMESTAMP
-            """)
-
-            # 功法技能关联表
-            await self._ensure_table_exists("method_skills", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                method_id TEXT NOT NULL,
-                skill_name TEXT NOT NULL,
-                skill_type TEXT,
-                unlock_proficiency INTEGER DEFAULT 0,
-                element TEXT,
-                mp_cost INTEGER DEFAULT 10,
-                cooldown INTEGER DEFAULT 0,
-                base_damage INTEGER DEFAULT 0,
-                effect_description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 坊市物品表
-            await self._ensure_table_exists("market_items", """
-                id TEXT PRIMARY KEY,
-                seller_id TEXT NOT NULL,
-                item_type TEXT NOT NULL,
-                item_id TEXT NOT NULL,
-                item_name TEXT NOT NULL,
-                quality TEXT,
-                description TEXT,
-                price INTEGER NOT NULL,
-                quantity INTEGER DEFAULT 1,
-                attributes TEXT,
-                status TEXT DEFAULT 'active',
-                listed_at TEXT NOT NULL,
-                created_at TEXT,
-                sold_at TEXT
-            """)
-
-            # 坊市交易记录表
-            await self._ensure_table_exists("market_transactions", """
-                id TEXT PRIMARY KEY,
-                listing_id TEXT NOT NULL,
-                seller_id TEXT NOT NULL,
-                buyer_id TEXT NOT NULL,
-                item_type TEXT NOT NULL,
-                item_id TEXT NOT NULL,
-                price INTEGER NOT NULL,
-                quantity INTEGER NOT NULL,
-                tax INTEGER DEFAULT 0,
-                transaction_time TEXT NOT NULL
-            """)
-
-            # ===== 灵宠系统表 =====
-            # 灵宠模板表
-            logger.info("开始创建/更新表: pets")
-            await self._ensure_table_exists("pets", """
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                pet_type TEXT NOT NULL,
-                rarity TEXT NOT NULL,
-                description TEXT,
-                base_attributes TEXT NOT NULL,
-                growth_rate REAL DEFAULT 1.0,
-                max_level INTEGER DEFAULT 50,
-                element TEXT,
-                evolution_to INTEGER,
-                capture_difficulty INTEGER DEFAULT 50,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 玩家灵宠表
-            await self._ensure_table_exists("player_pets", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                pet_id INTEGER NOT NULL,
-                pet_name TEXT NOT NULL,
-                level INTEGER DEFAULT 1,
-                experience INTEGER DEFAULT 0,
-                is_active INTEGER DEFAULT 0,
-                intimacy INTEGER DEFAULT 0,
-                battle_count INTEGER DEFAULT 0,
-                acquired_from TEXT NOT NULL,
-                acquired_at TIMESTAMP NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 灵宠秘境记录表
-            await self._ensure_table_exists("pet_secret_realms", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT UNIQUE NOT NULL,
-                realm_level INTEGER DEFAULT 1,
-                exploration_count INTEGER DEFAULT 0,
-                last_exploration_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 灵脉表
-            await self._ensure_table_exists("spirit_veins", """
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                level INTEGER NOT NULL,
-                location TEXT NOT NULL,
-                base_income INTEGER NOT NULL,
-                owner_id TEXT,
-                owner_name TEXT,
-                occupied_at TIMESTAMP,
-                last_collect_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 探索故事历史表
-            await self._ensure_table_exists("exploration_stories", """
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                location_id INTEGER NOT NULL,
-                story_type TEXT NOT NULL,
-                story_title TEXT NOT NULL,
-                story_content TEXT NOT NULL,
-                choices TEXT,
-                has_choice INTEGER DEFAULT 0,
-                selected_choice TEXT,
-                outcome TEXT,
-                rewards TEXT,
-                consequences TEXT,
-                is_completed INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                completed_at TIMESTAMP
-            """)
-
-            # 玩家故事状态表（用于跨多次探索的连续剧情）
-            await self._ensure_table_exists("player_story_states", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                story_arc_id TEXT NOT NULL,
-                current_chapter INTEGER DEFAULT 1,
-                total_chapters INTEGER DEFAULT 1,
-                state_data TEXT,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, story_arc_id)
-            """)
-
-            # 探索后果记录表（记录玩家选择的长期影响）
-            await self._ensure_table_exists("exploration_consequences", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                story_id TEXT NOT NULL,
-                consequence_type TEXT NOT NULL,
-                consequence_value TEXT NOT NULL,
-                expires_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            """)
-
-            # 玩家状态表（重伤、中毒等临时状态）
-            await self._ensure_table_exists("player_status", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                status_type TEXT NOT NULL,
-                status_data TEXT,
-                severity INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL
-            """)
-
-            # 探索队伍表
-            await self._ensure_table_exists("exploration_teams", """
-                id TEXT PRIMARY KEY,
-                leader_id TEXT NOT NULL,
-                location_id INTEGER NOT NULL,
-                status TEXT DEFAULT 'waiting',
-                session_data TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                started_at TIMESTAMP,
-                finished_at TIMESTAMP
-            """)
-
-            # 队伍成员表
-            await self._ensure_table_exists("team_members", """
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                team_id TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                status TEXT DEFAULT 'invited',
-                joined_at TIMESTAMP,
-                UNIQUE(team_id, user_id)
-            """)
-
-            logger.info("✓ 所有表结构创建/更新完成")
+            logger.debug("开始创建或更新数据库表结构...")
+
+            # 一次性获取现有表及其列
+            columns_by_table = await self._load_table_columns()
+            logger.debug(f"现有表: {list(columns_by_table)}")
+
+            statements = []
+            for table_name, schema in _TABLE_SCHEMAS:
+                statements.extend(self._plan_table_ddl(table_name, schema, columns_by_table))
+
+            if not statements:
+                logger.info("✓ 表结构无需变更")
+                return
+
+            for statement in statements:
+                logger.debug(f"执行表结构变更: {statement.split('(')[0].strip()}")
+
+            # 全部DDL在一个 IMMEDIATE 事务中一次提交，只需一次线程往返
+            await self.db.executescript(
+                "BEGIN IMMEDIATE;\n" + ";\n".join(statements) + ";\nCOMMIT;"
+            )
+            logger.info(f"✓ 所有表结构创建/更新完成，共 {len(statements)} 条变更")
         except Exception as e:
             logger.error(f"创建或更新表结构时出错: {e}", exc_info=True)
             raise
 
     async def _create_indexes(self):
-        """创建索引以优化查询性能"""
+        """创建索引以优化查询性能（在数据加载完成后调用）"""
         try:
-            logger.info("开始创建索引...")
-            indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_players_realm ON players(realm)",
-            "CREATE INDEX IF NOT EXISTS idx_equipment_user ON equipment(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_equipment_equipped ON equipment(user_id, is_equipped)",
-            "CREATE INDEX IF NOT EXISTS idx_skills_user ON skills(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_professions_user ON professions(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_recipes_type ON recipes(recipe_type)",
-            "CREATE INDEX IF NOT EXISTS idx_items_user ON items(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_items_type ON items(user_id, item_type)",
-            "CREATE INDEX IF NOT EXISTS idx_cultivation_methods_user ON cultivation_methods(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_cultivation_methods_equipped ON cultivation_methods(user_id, is_equipped)",
-            "CREATE INDEX IF NOT EXISTS idx_sect_members_sect ON sect_members(sect_id)",
-            "CREATE INDEX IF NOT EXISTS idx_sect_members_user ON sect_members(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_tribulations_user ON tribulations(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_tribulations_status ON tribulations(user_id, status)",
-            "CREATE INDEX IF NOT EXISTS idx_active_formations_user ON active_formations(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_active_formations_location ON active_formations(location_id, is_active)",
-            "CREATE INDEX IF NOT EXISTS idx_player_pets_user ON player_pets(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_player_pets_active ON player_pets(user_id, is_active)",
-            "CREATE INDEX IF NOT EXISTS idx_pet_secret_realms_user ON pet_secret_realms(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_spirit_veins_owner ON spirit_veins(owner_id)",
-            "CREATE INDEX IF NOT EXISTS idx_spirit_veins_level ON spirit_veins(level)",
-            "CREATE INDEX IF NOT EXISTS idx_locations_region ON locations(region_type)",
-            "CREATE INDEX IF NOT EXISTS idx_locations_danger ON locations(danger_level)",
-            "CREATE INDEX IF NOT EXISTS idx_player_locations_user ON player_locations(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_player_locations_location ON player_locations(current_location_id)",
-            "CREATE INDEX IF NOT EXISTS idx_player_cultivation_methods_user ON player_cultivation_methods(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_player_cultivation_methods_method ON player_cultivation_methods(method_id)",
-            "CREATE INDEX IF NOT EXISTS idx_player_cultivation_methods_main ON player_cultivation_methods(user_id, is_main)",
-            "CREATE INDEX IF NOT EXISTS idx_method_skills_method ON method_skills(method_id)",
-            "CREATE INDEX IF NOT EXISTS idx_market_items_type ON market_items(item_type, status)",
-            "CREATE INDEX IF NOT EXISTS idx_market_items_seller ON market_items(seller_id)",
-            "CREATE INDEX IF NOT EXISTS idx_market_transactions_buyer ON market_transactions(buyer_id)",
-            "CREATE INDEX IF NOT EXISTS idx_market_transactions_seller ON market_transactions(seller_id)",
-            "CREATE INDEX IF NOT EXISTS idx_exploration_stories_user ON exploration_stories(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_exploration_stories_location ON exploration_stories(location_id)",
-            "CREATE INDEX IF NOT EXISTS idx_exploration_stories_completed ON exploration_stories(user_id, is_completed)",
-            "CREATE INDEX IF NOT EXISTS idx_player_story_states_user ON player_story_states(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_exploration_consequences_user ON exploration_consequences(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_exploration_consequences_story ON exploration_consequences(story_id)",
-        ]
-
-            for index_sql in indexes:
-                await self.execute(index_sql)
+            logger.debug("开始创建索引...")
+            # 一次提交全部索引DDL，并用 ANALYZE 为查询规划器提供统计信息
+            await self.db.executescript(_INDEX_SCRIPT)
 
-            logger.info("索引创建完成")
+            logger.info(f"索引创建完成，共 {len(_INDEXES)} 个")
         except Exception as e:
             logger.error(f"创建索引时出错: {e}", exc_info=True)
             raise
 
+    async def _load_applied_migrations(self) -> set:
+        """读取已执行的一次性迁移ID"""
+        cursor = await self.db.execute("SELECT id FROM schema_migrations")
+        rows = await cursor.fetchall()
+        await cursor.close()
+        return {row[0] for row in rows}
+
+    async def _run_once(self, applied: set, migration_id: str, step):
+        """
+        执行一次性迁移步骤，成功后记录到 schema_migrations
+
+        Args:
+            applied: 已执行的迁移ID集合
+            migration_id: 迁移ID
+            step: 无参数的异步迁移函数，返回 False 表示失败（下次启动重试）
+        """
+        if migration_id in applied:
+            return
+
+        if await step() is False:
+            return
+        await self.execute_write(
+            "INSERT OR IGNORE INTO schema_migrations (id) VALUES (?)",
+            (migration_id,)
+        )
+        applied.add(migration_id)
 
     async def _seed_initial_locations(self):
         """初始化基础地点数据"""
         try:
-            # 检查是否已经有地点数据
-            cursor = await self.execute("SELECT COUNT(*) as count FROM locations")
-            row = await cursor.fetchone()
+            logger.debug("开始初始化基础地点...")
 
-            if row and row['count'] > 0:
-                # 已有地点数据，跳过初始化
-                return
+            # 在同一事务中批量插入初始地点，只提交一次；已存在的地点按名称去重
+            async with self.transaction("IMMEDIATE") as db:
+                cursor = await db.executemany(_INSERT_LOCATION_SQL, INITIAL_LOCATION_ROWS)
+                inserted = cursor.rowcount
+                await cursor.close()
 
-            logger.info("开始初始化基础地点...")
-
-            # 初始地点列表
-            initial_locations = [
-                {
-                    'name': '新手村',
-                    'description': '一个宁静祥和的小村落，灵气稀薄但十分安全，是众多修仙者踏上修仙之路的起点。村中有简陋的修炼场和基础的药材商铺。',
-                    'region_type': 'city',
-                    'danger_level': 1,
-                    'spirit_energy_density': 20,
-                    'min_realm': '炼气期',
-                    'coordinates_x': 0,
-                    'coordinates_y': 0,
-                    'is_safe_zone': 1,
-                    'connected_locations': '[2,3]'
-                },
-                {
-                    'name': '青云山',
-                    'description': '一座云雾缭绕的灵山，山间灵气充沛，适合低阶修士修炼。山中偶有低阶妖兽出没，需要小心应对。',
-                    'region_type': 'mountain',
-                    'danger_level': 3,
-                    'spirit_energy_density': 45,
-                    'min_realm': '炼气期',
-                    'coordinates_x': 10,
-                    'coordinates_y': 20,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[1,4,5]'
-                },
-                {
-                    'name': '灵泉谷',
-                    'description': '山谷深处有一眼灵泉，常年喷涌着富含灵气的泉水。谷中药草丰茂，是采集灵药的好去处。',
-                    'region_type': 'forest',
-                    'danger_level': 2,
-                    'spirit_energy_density': 40,
-                    'min_realm': '炼气期',
-                    'coordinates_x': -15,
-                    'coordinates_y': 10,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[1,6]'
-                },
-                {
-                    'name': '天元城',
-                    'description': '修仙界繁华的交易中心，城中有各种店铺、拍卖行和任务大厅。城内禁止私斗，是修士们的安全港湾。',
-                    'region_type': 'city',
-                    'danger_level': 1,
-                    'spirit_energy_density': 35,
-                    'min_realm': '筑基期',
-                    'coordinates_x': 50,
-                    'coordinates_y': 0,
-                    'is_safe_zone': 1,
-                    'connected_locations': '[2,5,7]'
-                },
-                {
-                    'name': '紫雷峰',
-                    'description': '常年雷霆轰鸣的险峰，峰顶灵气浓郁但危机四伏。适合筑基期修士突破境界，但需警惕雷劫。',
-                    'region_type': 'mountain',
-                    'danger_level': 5,
-                    'spirit_energy_density': 60,
-                    'min_realm': '筑基期',
-                    'coordinates_x': 30,
-                    'coordinates_y': 40,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[2,4,8]'
-                },
-                {
-                    'name': '幽暗森林',
-                    'description': '古老而神秘的原始森林，林中妖兽众多，灵药珍稀。深处传说有上古修士的洞府遗迹。',
-                    'region_type': 'forest',
-                    'danger_level': 4,
-                    'spirit_energy_density': 50,
-                    'min_realm': '筑基期',
-                    'coordinates_x': -30,
-                    'coordinates_y': 25,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[3,9]'
-                },
-                {
-                    'name': '碧波湖',
-                    'description': '广阔无垠的灵湖，湖水蕴含水系灵气，湖底有水晶矿脉。水系修士在此修炼事半功倍。',
-                    'region_type': 'ocean',
-                    'danger_level': 3,
-                    'spirit_energy_density': 55,
-                    'min_realm': '筑基期',
-                    'coordinates_x': 40,
-                    'coordinates_y': -20,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[4,8]'
-                },
-                {
-                    'name': '烈焰山',
-                    'description': '终年喷发岩浆的活火山，火系灵气极为浓郁。火系修士的修炼圣地，但常人难以靠近。',
-                    'region_type': 'mountain',
-                    'danger_level': 6,
-                    'spirit_energy_density': 70,
-                    'min_realm': '金丹期',
-                    'coordinates_x': 60,
-                    'coordinates_y': 60,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[5,7,10]'
-                },
-                {
-                    'name': '迷雾沼泽',
-                    'description': '终年笼罩在毒雾中的危险沼泽，瘴气弥漫，毒虫横行。但沼泽深处生长着珍贵的炼丹灵药。',
-                    'region_type': 'forest',
-                    'danger_level': 7,
-                    'spirit_energy_density': 45,
-                    'min_realm': '金丹期',
-                    'coordinates_x': -50,
-                    'coordinates_y': 50,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[6,10]'
-                },
-                {
-                    'name': '虚空裂隙',
-                    'description': '空间法则紊乱的神秘区域，时有空间风暴肆虐。传说中通往其他世界的通道，只有元婴期以上修士才敢涉足。',
-                    'region_type': 'void',
-                    'danger_level': 9,
-                    'spirit_energy_density': 85,
-                    'min_realm': '元婴期',
-                    'coordinates_x': 100,
-                    'coordinates_y': 100,
-                    'is_safe_zone': 0,
-                    'connected_locations': '[8,9]'
-                }
-            ]
-
-            # 插入初始地点
-            for loc in initial_locations:
-                await self.execute("""
-                    INSERT INTO locations (
-                        name, description, region_type, danger_level,
-                        spirit_energy_density, min_realm, coordinates_x, coordinates_y,
-                        is_safe_zone, connected_locations
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    loc['name'], loc['description'], loc['region_type'],
-                    loc['danger_level'], loc['spirit_energy_density'],
-                    loc['min_realm'], loc['coordinates_x'], loc['coordinates_y'],
-                    loc['is_safe_zone'], loc['connected_locations']
-                ))
-
-            logger.info(f"成功初始化 {len(initial_locations)} 个基础地点")
+            if inserted:
+                logger.info(f"成功初始化 {inserted} 个基础地点")
 
         except Exception as e:
             logger.error(f"初始化基础地点失败: {e}", exc_info=True)
-            pass
+            return False
+
+    async def _normalize_equipment_extra_attrs(self):
+        """将旧格式的装备附加属性改写为 JSON"""
+        try:
+            updated = await self.execute_write(_NORMALIZE_EQUIPMENT_EXTRA_ATTRS_SQL)
+            if updated:
+                logger.info(f"已将 {updated} 件装备的附加属性转换为 JSON")
+        except Exception as e:
+            logger.error(f"转换装备附加属性失败: {e}", exc_info=True)
+            return False
+
+    async def _delete_legacy_team_invites(self):
+        """删除没有过期时间的旧队伍邀请"""
+        try:
+            deleted = await self.execute_write(_DELETE_LEGACY_TEAM_INVITES_SQL)
+            if deleted:
+                logger.info(f"已清理 {deleted} 条旧队伍邀请")
+        except Exception as e:
+            logger.error(f"清理旧队伍邀请失败: {e}", exc_info=True)
+            return False
 
     async def _fix_player_attributes(self):
         """
@@ -1003,71 +1374,78 @@ class DatabaseManager:
         3. 修复前应该先备份数据库
         """
         try:
-            # 检查是否有玩家数据
-            cursor = await self.execute("SELECT COUNT(*) as count FROM players")
-            row = await cursor.fetchone()
-
-            if not row or row['count'] == 0:
+            # 按 user_id 分批读取玩家，内存占用与玩家总数无关
+            last_user_id = ""
+            checked_count = 0
+            fixed_count = 0
+            # 灵根组合远少于玩家数量：按组合缓存加成，每批一次 executemany 写回
+            bonus_cache: Dict[tuple, dict] = {}
+
+            while True:
+                players_data = await self.fetchall(
+                    _SELECT_PLAYER_ATTRS_PAGE_SQL, (last_user_id, _FIX_ATTRIBUTES_BATCH_SIZE)
+                )
+                if not players_data:
+                    break
+                if checked_count == 0:
+                    logger.info("开始修复玩家属性...")
+                last_user_id = players_data[-1]['user_id']
+                checked_count += len(players_data)
+                updates = []
+
+                for player_data in players_data:
+                    try:
+                        player = _PlayerAttrs._make(player_data)
+
+                        # 计算正确属性
+                        correct_attrs = self._calculate_correct_attributes(player, bonus_cache)
+
+                        # 检查是否需要修复
+                        needs_fix = (
+                            player.max_hp != correct_attrs['max_hp'] or
+                            player.max_mp != correct_attrs['max_mp'] or
+                            player.attack != correct_attrs['attack'] or
+                            player.defense != correct_attrs['defense']
+                        )
+
+                        if needs_fix:
+                            updates.append((
+                                correct_attrs['max_hp'],
+                                correct_attrs['hp'],
+                                correct_attrs['max_mp'],
+                                correct_attrs['mp'],
+                                correct_attrs['attack'],
+                                correct_attrs['defense'],
+                                player.user_id
+                            ))
+
+                            logger.debug(f"修复玩家 {player.name} 的属性: "
+                                       f"HP {player.max_hp}->{correct_attrs['max_hp']}, "
+                                       f"MP {player.max_mp}->{correct_attrs['max_mp']}, "
+                                       f"攻击 {player.attack}->{correct_attrs['attack']}, "
+                                       f"防御 {player.defense}->{correct_attrs['defense']}")
+
+                    except Exception as e:
+                        logger.error(f"修复玩家 {player_data['name']} 属性失败: {e}")
+                        continue
+
+                # 本批需要修复的玩家在一个事务中批量更新
+                if updates:
+                    async with self.transaction("IMMEDIATE") as db:
+                        await db.executemany(_UPDATE_PLAYER_ATTRS_SQL, updates)
+                    fixed_count += len(updates)
+
+            if checked_count == 0:
                 logger.info("没有玩家数据，跳过属性修复")
                 return
 
-            logger.info(f"开始修复 {row['count']} 个玩家的属性...")
-
-            # 获取所有玩家
-            players_data = await self.fetchall("SELECT * FROM players")
-            fixed_count = 0
-
-            for player_data in players_data:
-                try:
-                    # 转换为Player对象
-                    from ..models.player_model import Player
-                    player = Player.from_dict(dict(player_data))
-
-                    # 计算正确属性
-                    correct_attrs = self._calculate_correct_attributes(player)
-
-                    # 检查是否需要修复
-                    needs_fix = (
-                        player.max_hp != correct_attrs['max_hp'] or
-                        player.max_mp != correct_attrs['max_mp'] or
-                        player.attack != correct_attrs['attack'] or
-                        player.defense != correct_attrs['defense']
-                    )
-
-                    if needs_fix:
-                        # 更新玩家属性
-                        await self.execute("""
-                            UPDATE players
-                            SET max_hp = ?, hp = ?, max_mp = ?, mp = ?,
-                                attack = ?, defense = ?, updated_at = CURRENT_TIMESTAMP
-                            WHERE user_id = ?
-                        """, (
-                            correct_attrs['max_hp'],
-                            correct_attrs['hp'],
-                            correct_attrs['max_mp'],
-                            correct_attrs['mp'],
-                            correct_attrs['attack'],
-                            correct_attrs['defense'],
-                            player.user_id
-                        ))
-                        fixed_count += 1
-
-                        logger.debug(f"修复玩家 {player.name} 的属性: "
-                                   f"HP {player.max_hp}->{correct_attrs['max_hp']}, "
-                                   f"MP {player.max_mp}->{correct_attrs['max_mp']}, "
-                                   f"攻击 {player.attack}->{correct_attrs['attack']}, "
-                                   f"防御 {player.defense}->{correct_attrs['defense']}")
-
-                except Exception as e:
-                    logger.error(f"修复玩家 {player_data.get('name', 'Unknown')} 属性失败: {e}")
-                    continue
-
-            logger.info(f"玩家属性修复完成，共修复 {fixed_count} 个玩家")
+            logger.info(f"玩家属性修复完成，共检查 {checked_count} 个玩家，修复 {fixed_count} 个玩家")
 
         except Exception as e:
             logger.error(f"玩家属性修复过程出错: {e}", exc_info=True)
+            return False
 
-    def _calculate_correct_attributes(self, player) -> dict:
+    def _calculate_correct_attributes(self, player, bonus_cache: Optional[dict] = None) -> dict:
         """
         计算玩家的正确属性值
 
@@ -1086,7 +1464,8 @@ class DatabaseManager:
         因此，此方法计算出的属性可能低于玩家实际应有的属性。
 
         Args:
-            player: 玩家对象
+            player: 玩家对象或 _PlayerAttrs（按属性名读取所需字段）
+            bonus_cache: 灵根组合 -> 战斗加成 的缓存，批量计算时复用
 
         Returns:
             属性值字典（仅包含基础计算结果）
@@ -1101,8 +1480,6 @@ class DatabaseManager:
         }
 
         # 2. 计算初始战斗属性（炼气期初期的基础���性）
-        from ..utils.constants import INITIAL_COMBAT_STATS
-
         base_hp = INITIAL_COMBAT_STATS['max_hp']
         base_mp = INITIAL_COMBAT_STATS['max_mp']
         base_attack = INITIAL_COMBAT_STATS['attack']
@@ -1124,15 +1501,23 @@ class DatabaseManager:
 
         # 3. 应用灵根战斗加成
         if player.spirit_root_type:
-            from .spirit_root import SpiritRootFactory
-            spirit_root = {
-                'type': player.spirit_root_type,
-                'quality': player.spirit_root_quality,
-                'value': player.spirit_root_value,
-                'purity': player.spirit_root_purity
-            }
-            bonuses = SpiritRootFactory.calculate_bonuses(spirit_root)
-            combat_bonus = bonuses.get('combat_bonus', {})
+            # 同一灵根组合的加成只计算一次
+            root_key = (
+                player.spirit_root_type, player.spirit_root_quality,
+                player.spirit_root_value, player.spirit_root_purity
+            )
+            combat_bonus = bonus_cache.get(root_key) if bonus_cache is not None else None
+            if combat_bonus is None:
+                spirit_root = {
+                    'type': player.spirit_root_type,
+                    'quality': player.spirit_root_quality,
+                    'value': player.spirit_root_value,
+                    'purity': player.spirit_root_purity
+                }
+                bonuses = SpiritRootFactory.calculate_bonuses(spirit_root)
+                combat_bonus = bonuses.get('combat_bonus', {})
+                if bonus_cache is not None:
+                    bonus_cache[root_key] = combat_bonus
 
             if 'attack' in combat_bonus:
                 base_attack = int(base_attack * (1 + combat_bonus['attack']))
@@ -1145,40 +1530,12 @@ class DatabaseManager:
                 bonus_mp = int(base_mp * combat_bonus['max_mp'])
                 base_mp += bonus_mp
 
-        # 4. 计算所有境界提升带来的属性加成
-        from ..utils.constants import REALMS, REALM_ORDER
-        current_realm_index = REALMS[player.realm]['index']
-
-        total_hp_bonus = 0
-        total_mp_bonus = 0
-        total_attack_bonus = 0
-        total_defense_bonus = 0
-
-        # 遍历所有已经突破过的境界
-        for realm_name in REALM_ORDER:
-            realm_config = REALMS[realm_name]
-            realm_index = realm_config['index']
-
-            # 如果是当前境界之前的境界，计算完整加成
-            if realm_index < current_realm_index:
-                # 大境界突破：获得完整的境界属性加成 * 4（因为有4个小境界）
-                attribute_bonus = realm_config.get('attribute_bonus', {})
-                total_hp_bonus += attribute_bonus.get('max_hp', 0) * 4
-                total_mp_bonus += attribute_bonus.get('max_mp', 0) * 4
-                total_attack_bonus += attribute_bonus.get('attack', 0) * 4
-                total_defense_bonus += attribute_bonus.get('defense', 0) * 4
-
-            # 如果是当前境界，根据小等级计算
-            elif realm_index == current_realm_index:
-                attribute_bonus = realm_config.get('attribute_bonus', {})
-                # 小境界提升：每级25%的境界属性加成
-                level_ratio = 0.25
-                levels_passed = player.realm_level  # 当前小境界 1-4
-
-                total_hp_bonus += int(attribute_bonus.get('max_hp', 0) * level_ratio * levels_passed)
-                total_mp_bonus += int(attribute_bonus.get('max_mp', 0) * level_ratio * levels_passed)
-                total_attack_bonus += int(attribute_bonus.get('attack', 0) * level_ratio * levels_passed)
-                total_defense_bonus += int(attribute_bonus.get('defense', 0) * level_ratio * levels_passed)
+        # 4. 计算所有境界提升带来的属性加成（按境界+小境界查预计算表）
+        realm_key = (player.realm, player.realm_level)
+        realm_total = _REALM_LEVEL_BONUS.get(realm_key)
+        if realm_total is None:
+            realm_total = _realm_level_bonus(*realm_key)
+        total_hp_bonus, total_mp_bonus, total_attack_bonus, total_defense_bonus = realm_total
 
         # 5. 计算最��属性
         final_max_hp = base_hp + total_hp_bonus
@@ -1203,6 +1560,9 @@ class DatabaseManager:
         """
         执行SQL语句
 
+        事务外的单条语句由 SQLite 自动提交（写连接工作在 autocommit 模式）。
+        需要把多条写语句合并为一次提交时，请使用 transaction() 或 execute_many()。
+
         Args:
             sql: SQL语句
             params: 参数元组
@@ -1214,16 +1574,116 @@ class DatabaseManager:
             raise RuntimeError("数据库未初始化,请先调用init_db()")
 
         try:
-            if params:
-                cursor = await self.db.execute(sql, params)
+            if self._in_transaction:
+                cursor = await self.db.execute(sql, params or ())
             else:
-                cursor = await self.db.execute(sql)
-            await self.db.commit()
+                async with self._write_lock:
+                    cursor = await self.db.execute(sql, params or ())
+                    if self.db.in_transaction:
+                        await self.db.commit()
+            if sql.lstrip()[:6].upper() in _DDL_PREFIXES:
+                self._invalidate_schema_cache()
             return cursor
         except Exception as e:
             logger.error(f"SQL执行失败: {sql[:100]}..., 错误: {e}", exc_info=True)
             raise
 
+    async def execute_write(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> int:
+        """
+        执行写语句并立即关闭游标
+
+        Args:
+            sql: SQL语句
+            params: 参数元组
+
+        Returns:
+            受影响的行数
+        """
+        cursor = await self.execute(sql, params)
+        rowcount = cursor.rowcount
+        await cursor.close()
+        return rowcount
+
+    async def insert_returning(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]] = None
+    ) -> Optional[Any]:
+        """
+        执行带 RETURNING 子句的写语句，在同一次往返中取回结果
+
+        使用方式:
+            new_id = await db.insert_returning(
+                "INSERT INTO t (name) VALUES (?) RETURNING id", ("x",)
+            )
+
+        Args:
+            sql: 以 RETURNING 结尾的 INSERT/UPDATE/DELETE 语句
+            params: 参数元组
+
+        Returns:
+            RETURNING 的第一列值（无结果时为 None）
+        """
+        if self.db is None:
+            raise RuntimeError("数据库未初始化,请先调用init_db()")
+
+        if self._in_transaction:
+            return await self._insert_returning(sql, params)
+        async with self._write_lock:
+            return await self._insert_returning(sql, params)
+
+    async def _insert_returning(
+        self,
+        sql: str,
+        params: Optional[Tuple[Any, ...]]
+    ) -> Optional[Any]:
+        """在写连接上执行 RETURNING 语句（调用方已持有写锁或处于本任务的事务中）"""
+        own_commit = not self._in_transaction
+        try:
+            cursor = await self.db.execute(sql, params or ())
+            # RETURNING 的结果必须在提交前读完
+            row = await cursor.fetchone()
+            await cursor.close()
+            if own_commit and self.db.in_transaction:
+                await self.db.commit()
+            return row[0] if row is not None else None
+        except Exception as e:
+            if own_commit and self.db.in_transaction:
+                await self.db.rollback()
+            logger.error(f"SQL执行失败: {sql[:100]}..., 错误: {e}", exc_info=True)
+            raise
+
+    async def execute_many(self, sql: str, seq_of_params) -> None:
+        """
+        使用同一条SQL批量执行多组参数，只提交一次
+
+        Args:
+            sql: SQL语句
+            seq_of_params: 参数元组序列
+        """
+        if self.db is None:
+            raise RuntimeError("数据库未初始化,请先调用init_db()")
+
+        # 自动提交模式下 executemany 会逐行提交，事务外需显式包一层事务
+        if self._in_transaction:
+            try:
+                await self.db.executemany(sql, seq_of_params)
+            except Exception as e:
+                logger.error(f"批量SQL执行失败: {sql[:100]}..., 错误: {e}", exc_info=True)
+                raise
+            return
+
+        async with self.transaction("IMMEDIATE") as db:
+            try:
+                await db.executemany(sql, seq_of_params)
+            except Exception as e:
+                logger.error(f"批量SQL执行失败: {sql[:100]}..., 错误: {e}", exc_info=True)
+                raise
+
     async def fetchone(
         self,
         sql: str,
@@ -1243,13 +1703,9 @@ class DatabaseManager:
             raise RuntimeError("数据库未初始化,请先调用init_db()")
 
         try:
-            if params:
-                cursor = await self.db.execute(sql, params)
-            else:
-                cursor = await self.db.execute(sql)
-            row = await cursor.fetchone()
-            await cursor.close()
-            return row
+            async with self.reader() as conn:
+                async with conn.execute(sql, params or ()) as cursor:
+                    return await cursor.fetchone()
         except Exception as e:
             logger.error(f"查询失败: {sql[:100]}..., 错误: {e}", exc_info=True)
             raise
@@ -1273,43 +1729,96 @@ class DatabaseManager:
             raise RuntimeError("数据库未初始化,请先调用init_db()")
 
         try:
-            if params:
-                cursor = await self.db.execute(sql, params)
-            else:
-                cursor = await self.db.execute(sql)
-            rows = await cursor.fetchall()
-            await cursor.close()
-            return rows
+            async with self.reader() as conn:
+                async with conn.execute(sql, params or ()) as cursor:
+                    return await cursor.fetchall()
         except Exception as e:
             logger.error(f"查询失败: {sql[:100]}..., 错误: {e}", exc_info=True)
             raise
 
+    @property
+    def _in_transaction(self) -> bool:
+        """当前任务是否处于 transaction() 上下文中"""
+        return self._tx_depth.get() > 0
+
     @asynccontextmanager
-    async def transaction(self):
+    async def transaction(self, mode: str = "DEFERRED"):
         """
-        事务上下文管理器
+        事务上下文管理器（可嵌套）
+
+        最外层开启真正的事务并在结束时提交，整个事务期间持有写锁，
+        其他任务的写入会等待事务结束；同一任务内的嵌套调用使用 SAVEPOINT，
+        内层失败只回滚到保存点，整体仍只在最外层提交一次
 
         使用方式:
             async with db.transaction():
                 await db.execute(...)
                 await db.execute(...)
+
+        Args:
+            mode: 事务类型 DEFERRED / IMMEDIATE / EXCLUSIVE（仅最外层生效）；
+                  先读后写的批量写入建议用 IMMEDIATE，开始时即取得写锁，避免中途升级锁失败
         """
         if self.db is None:
             raise RuntimeError("数据库未初始化,请先调用init_db()")
+        mode = mode.upper()
+        if mode not in _TRANSACTION_MODES:
+            raise ValueError(f"不支持的事务类型: {mode}")
+
+        depth = self._tx_depth.get()
+        # 本任务已有事务（外层 transaction()）时加入其中，否则先取得写锁
+        nested = depth > 0
+        savepoint = f"sp_{depth}"
 
+        if not nested:
+            await self._write_lock.acquire()
         try:
-            await self.db.execute("BEGIN")
-            yield self.db
-            await self.db.commit()
-            logger.debug("事务提交成功")
-        except Exception as e:
-            await self.db.rollback()
-            logger.error(f"事务回滚: {e}", exc_info=True)
-            raise
+            await self.db.execute(f"SAVEPOINT {savepoint}" if nested else f"BEGIN {mode}")
+            token = self._tx_depth.set(depth + 1)
+            try:
+                yield self.db
+                if nested:
+                    await self.db.execute(f"RELEASE SAVEPOINT {savepoint}")
+                else:
+                    await self.db.commit()
+                    logger.debug("事务提交成功")
+            except BaseException as e:
+                # 包括任务被取消，保证不会留下未结束的事务
+                if nested:
+                    await self.db.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                    await self.db.execute(f"RELEASE SAVEPOINT {savepoint}")
+                else:
+                    await self.db.rollback()
+                    logger.error(f"事务回滚: {e}", exc_info=True)
+                raise
+            finally:
+                self._tx_depth.reset(token)
+        finally:
+            if not nested:
+                self._write_lock.release()
 
     async def close(self):
         """关闭数据库连接"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+
+        await self._close_readers()
         if self.db:
+            try:
+                await self.optimize()
+            except Exception as e:
+                logger.warning(f"关闭前更新统计信息失败: {e}")
+            if self._wal_enabled:
+                # 关闭前把 WAL 全部写回主库并截断，留下紧凑的数据库文件
+                try:
+                    await self._run_pragma(self.db, "PRAGMA wal_checkpoint(TRUNCATE)")
+                except Exception as e:
+                    logger.warning(f"关闭前检查点失败: {e}")
             await self.db.close()
             self.db = None
             logger.info("数据库连接已关闭")
@@ -1324,11 +1833,14 @@ class DatabaseManager:
         Returns:
             是否存在
         """
-        row = await self.fetchone(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-            (table_name,)
-        )
-        return row is not None
+        # 只信任“存在”的结果；不存在的表可能随时被其他模块创建
+        if table_name in self._existing_tables:
+            return True
+
+        # 未命中时一次性刷新全部表名，后续对其他表的检查直接查集合
+        rows = await self.fetchall(_TABLE_NAMES_SQL)
+        self._existing_tables = {row[0] for row in rows}
+        return table_name in self._existing_tables
 
     async def get_table_info(self, table_name: str) -> List[Dict[str, Any]]:
         """
@@ -1340,11 +1852,32 @@ class DatabaseManager:
         Returns:
             列信息列表
         """
-        rows = await self.fetchall(f"PRAGMA table_info({table_name})")
-        return [dict(row) for row in rows]
+        cached = self._table_info_cache.get(table_name)
+        if cached is not None:
+            return list(cached)
+
+        rows = await self.fetchall(_TABLE_INFO_SQL, (table_name,))
+        info = [dict(zip(_TABLE_INFO_KEYS, row)) for row in rows]
+        if info:
+            self._table_info_cache[table_name] = info
+        return list(info)
+
+    def _invalidate_schema_cache(self):
+        """清空表结构缓存（执行 DDL 后调用）"""
+        self._table_info_cache.clear()
+        self._existing_tables.clear()
+
+    async def optimize(self):
+        """按需更新查询规划统计信息（只分析统计已过期的表，开销很小）"""
+        await self._run_pragma(self.db, "PRAGMA optimize")
 
     async def vacuum(self):
-        """优化数据库,回收空间"""
+        """
+        整库重建以回收空间（仅供手动维护使用）
+
+        会持有排他锁并临时占用约一倍磁盘空间，日常空间回收由定期维护中的
+        incremental_vacuum 完成。
+        """
         try:
             await self.execute("VACUUM")
             logger.info("数据库优化完成")
@@ -4,14 +4,19 @@
 """
 
 import random
+import time
 import uuid
-from typing import Dict, List, Optional, Tuple
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import groupby
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from astrbot.api import logger
 
 from .database import DatabaseManager
 from .player import PlayerManager
-from ..models.equipment_model import Equipment
+from ..models.equipment_model import Equipment, EQUIPMENT_COLUMNS, QUALITY_SCORE_MULTIPLIERS
 from ..utils import (
     XiuxianException,
     EquipmentNotFoundError,
@@ -20,6 +25,223 @@ from ..utils import (
 )
 
 
+# 显式列出查询列，结果行可按位置直接构造 Equipment
+_SELECT_EQUIPMENT_SQL = f"SELECT {', '.join(EQUIPMENT_COLUMNS)} FROM equipment"
+
+# 玩家装备列表缓存：有效期（秒）和最多缓存的玩家数（超出时淘汰最早写入的）；
+# 装备的写入都经过 EquipmentSystem 的方法，写入后立即让相关缓存失效
+_EQUIPMENT_CACHE_TTL = 5.0
+_EQUIPMENT_CACHE_SIZE = 1024
+
+
+# 按 ID 批量查询时每条语句的 ID 个数（低于 SQLite 旧版本 999 个参数的上限）
+_ID_BATCH_SIZE = 900
+
+# 写入语句的列与 EQUIPMENT_COLUMNS 一致，模块加载时构建一次
+_INSERT_EQUIPMENT_SQL = (
+    f"INSERT INTO equipment ({', '.join(EQUIPMENT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in EQUIPMENT_COLUMNS)})"
+)
+# id 是第一列：UPDATE 的参数为 to_row()[1:] + (id,)
+_UPDATE_EQUIPMENT_SQL = (
+    f"UPDATE equipment SET {', '.join(f'{column} = ?' for column in EQUIPMENT_COLUMNS[1:])} WHERE id = ?"
+)
+
+# 与 Equipment.get_total_attack / get_total_defense / get_equipment_score 逐行等价的 SQL 表达式
+# （运算顺序保持一致，CAST AS INTEGER 与 int() 一样向零截断）
+_TOTAL_ATTACK_EXPR = "CAST(attack + attack * enhance_level * 0.1 AS INTEGER)"
+_TOTAL_DEFENSE_EXPR = "CAST(defense + defense * enhance_level * 0.1 AS INTEGER)"
+_QUALITY_MULTIPLIER_EXPR = (
+    "CASE quality "
+    + " ".join(f"WHEN '{quality}' THEN {multiplier!r}" for quality, multiplier in QUALITY_SCORE_MULTIPLIERS.items())
+    + " ELSE 1.0 END"
+)
+_SCORE_EXPR = (
+    f"CAST(({_TOTAL_ATTACK_EXPR} + {_TOTAL_DEFENSE_EXPR} + hp_bonus * 0.1 + mp_bonus * 0.1"
+    f" + enhance_level * 50) * {_QUALITY_MULTIPLIER_EXPR} AS INTEGER)"
+)
+
+# 附加属性（JSON）中参与汇总的键
+_EXTRA_ATTR_KEYS = ('crit_rate', 'dodge_rate', 'speed_bonus')
+
+
+def _extra_attr_sum_expr(key: str) -> str:
+    """附加属性求和表达式（非 JSON 的值不参与汇总）"""
+    return (
+        f"COALESCE(SUM(CASE WHEN json_valid(extra_attrs) "
+        f"THEN json_extract(extra_attrs, '$.{key}') END), 0)"
+    )
+
+
+# 已穿戴装备的属性汇总，由 SQLite 一次聚合完成
+_EQUIPMENT_STATS_SQL = f"""
+    SELECT COUNT(*),
+           COALESCE(SUM({_TOTAL_ATTACK_EXPR}), 0),
+           COALESCE(SUM({_TOTAL_DEFENSE_EXPR}), 0),
+           COALESCE(SUM(hp_bonus), 0),
+           COALESCE(SUM(mp_bonus), 0),
+           COALESCE(SUM({_SCORE_EXPR}), 0),
+           {', '.join(_extra_attr_sum_expr(key) for key in _EXTRA_ATTR_KEYS)}
+    FROM equipment
+    WHERE user_id = ? AND is_equipped = 1
+"""
+
+# 装备模板
+_EQUIPMENT_TEMPLATES: Dict[str, List[Dict]] = {
+    'weapon': [
+        {
+            'name': '新手剑',
+            'quality': '凡品',
+            'min_level': 1,
+            'max_level': 5,
+            'attack_range': (10, 20),
+            'description': '一把简单的新手剑'
+        },
+        {
+            'name': '精钢剑',
+            'quality': '灵品',
+            'min_level': 5,
+            'max_level': 15,
+            'attack_range': (20, 35),
+            'description': '用精钢打造的长剑'
+        },
+        {
+            'name': '灵剑',
+            'quality': '宝品',
+            'min_level': 15,
+            'max_level': 25,
+            'attack_range': (35, 50),
+            'crit_rate_chance': 0.3,
+            'description': '注入了灵力的宝剑'
+        },
+        {
+            'name': '仙剑',
+            'quality': '仙品',
+            'min_level': 25,
+            'max_level': 35,
+            'attack_range': (50, 70),
+            'crit_rate_chance': 0.5,
+            'special_effect': '攻击时额外造成10%伤害',
+            'description': '仙人使用的飞剑'
+        }
+    ],
+    'armor': [
+        {
+            'name': '布衣',
+            'quality': '凡品',
+            'min_level': 1,
+            'max_level': 5,
+            'defense_range': (5, 10),
+            'hp_range': (20, 30),
+            'description': '简单的布制衣服'
+        },
+        {
+            'name': '皮甲',
+            'quality': '灵品',
+            'min_level': 5,
+            'max_level': 15,
+            'defense_range': (10, 20),
+            'hp_range': (40, 60),
+            'description': '用兽皮制作的护甲'
+        },
+        {
+            'name': '灵甲',
+            'quality': '宝品',
+            'min_level': 15,
+            'max_level': 25,
+            'defense_range': (20, 35),
+            'hp_range': (80, 120),
+            'dodge_rate_chance': 0.3,
+            'description': '注入了灵力的护甲'
+        },
+        {
+            'name': '仙甲',
+            'quality': '仙品',
+            'min_level': 25,
+            'max_level': 35,
+            'defense_range': (35, 50),
+            'hp_range': (150, 200),
+            'dodge_rate_chance': 0.4,
+            'special_effect': '受到伤害时减少10%',
+            'description': '仙人护体的宝甲'
+        }
+    ],
+    'accessory': [
+        {
+            'name': '木戒指',
+            'quality': '凡品',
+            'min_level': 1,
+            'max_level': 5,
+            'mp_range': (10, 20),
+            'description': '简单的木制戒指'
+        },
+        {
+            'name': '玉佩',
+            'quality': '灵品',
+            'min_level': 5,
+            'max_level': 15,
+            'mp_range': (20, 40),
+            'hp_range': (30, 50),
+            'description': '温润的玉佩'
+        },
+        {
+            'name': '灵玉',
+            'quality': '宝品',
+            'min_level': 15,
+            'max_level': 25,
+            'mp_range': (50, 80),
+            'hp_range': (60, 100),
+            'speed_bonus_chance': 0.3,
+            'description': '蕴含灵力的宝玉'
+        },
+        {
+            'name': '仙玉',
+            'quality': '仙品',
+            'min_level': 25,
+            'max_level': 35,
+            'mp_range': (100, 150),
+            'hp_range': (120, 180),
+            'speed_bonus_chance': 0.5,
+            'special_effect': '法力恢复速度提升20%',
+            'description': '仙人佩戴的宝玉'
+        }
+    ]
+}
+
+# 各类型模板按最低等级升序排列，配合 bisect 直接切出可用模板
+for _templates in _EQUIPMENT_TEMPLATES.values():
+    _templates.sort(key=itemgetter('min_level'))
+_TEMPLATE_MIN_LEVELS: Dict[str, List[int]] = {
+    equipment_type: [template['min_level'] for template in templates]
+    for equipment_type, templates in _EQUIPMENT_TEMPLATES.items()
+}
+
+# 装备生成专用的随机数生成器（与全局 random 状态互不影响）
+_rng = random.Random()
+
+# 背包列表的显示文本
+_TYPE_LABELS = {
+    'weapon': '⚔️ 武器',
+    'armor': '🛡️ 护甲',
+    'accessory': '💍 饰品'
+}
+_EQUIPPED_MARKS = {True: "✅", False: "⭕"}
+_DIVIDER = "─" * 40
+
+# 各境界对应的基础综合等级
+_REALM_BASE_LEVELS = {
+    '炼气期': 1,
+    '筑基期': 10,
+    '金丹期': 20,
+    '元婴期': 30,
+    '化神期': 40,
+    '炼虚期': 50,
+    '合体期': 60,
+    '大乘期': 70,
+    '渡劫期': 80
+}
+
+
 class EquipmentSystem:
     """装备系统类"""
 
@@ -34,140 +256,24 @@ class EquipmentSystem:
         self.db = db
         self.player_mgr = player_mgr
 
+        # 装备表是否已确认存在（避免每次写入都执行一次 CREATE TABLE IF NOT EXISTS）
+        self._table_ready = False
+
+        # 玩家装备列表缓存 {user_id: (过期时间, 数据行)}；缓存不可变的数据行，
+        # 每次命中都重新构造 Equipment，调用方修改返回的对象不会影响缓存
+        self._equipment_cache: "OrderedDict[str, Tuple[float, List[Any]]]" = OrderedDict()
+
         # 装备槽位配置
         self.equipment_slots = {
             'weapon': '武器',
             'armor': '护甲',
             'accessory': '饰品'
         }
+        # 槽位中文名 -> 装备类型
+        self._slot_types = {name: slot_type for slot_type, name in self.equipment_slots.items()}
 
-        # 装备模板库
-        self.equipment_templates = self._init_equipment_templates()
-
-    def _init_equipment_templates(self) -> Dict[str, List[Dict]]:
-        """初始化装备模板"""
-        templates = {
-            'weapon': [
-                {
-                    'name': '新手剑',
-                    'quality': '凡品',
-                    'min_level': 1,
-                    'max_level': 5,
-                    'attack_range': (10, 20),
-                    'description': '一把简单的新手剑'
-                },
-                {
-                    'name': '精钢剑',
-                    'quality': '灵品',
-                    'min_level': 5,
-                    'max_level': 15,
-                    'attack_range': (20, 35),
-                    'description': '用精钢打造的长剑'
-                },
-                {
-                    'name': '灵剑',
-                    'quality': '宝品',
-                    'min_level': 15,
-                    'max_level': 25,
-                    'attack_range': (35, 50),
-                    'crit_rate_chance': 0.3,
-                    'description': '注入了灵力的宝剑'
-                },
-                {
-                    'name': '仙剑',
-                    'quality': '仙品',
-                    'min_level': 25,
-                    'max_level': 35,
-                    'attack_range': (50, 70),
-                    'crit_rate_chance': 0.5,
-                    'special_effect': '攻击时额外造成10%伤害',
-                    'description': '仙人使用的飞剑'
-                }
-            ],
-            'armor': [
-                {
-                    'name': '布衣',
-                    'quality': '凡品',
-                    'min_level': 1,
-                    'max_level': 5,
-                    'defense_range': (5, 10),
-                    'hp_range': (20, 30),
-                    'description': '简单的布制衣服'
-                },
-                {
-                    'name': '皮甲',
-                    'quality': '灵品',
-                    'min_level': 5,
-                    'max_level': 15,
-                    'defense_range': (10, 20),
-                    'hp_range': (40, 60),
-                    'description': '用兽皮制作的护甲'
-                },
-                {
-                    'name': '灵甲',
-                    'quality': '宝品',
-                    'min_level': 15,
-                    'max_level': 25,
-                    'defense_range': (20, 35),
-                    'hp_range': (80, 120),
-                    'dodge_rate_chance': 0.3,
-                    'description': '注入了灵力的护甲'
-                },
-                {
-                    'name': '仙甲',
-                    'quality': '仙品',
-                    'min_level': 25,
-                    'max_level': 35,
-                    'defense_range': (35, 50),
-                    'hp_range': (150, 200),
-                    'dodge_rate_chance': 0.4,
-                    'special_effect': '受到伤害时减少10%',
-                    'description': '仙人护体的宝甲'
-                }
-            ],
-            'accessory': [
-                {
-                    'name': '木戒指',
-                    'quality': '凡品',
-                    'min_level': 1,
-                    'max_level': 5,
-                    'mp_range': (10, 20),
-                    'description': '简单的木制戒指'
-                },
-                {
-                    'name': '玉佩',
-                    'quality': '灵品',
-                    'min_level': 5,
-                    'max_level': 15,
-                    'mp_range': (20, 40),
-                    'hp_range': (30, 50),
-                    'description': '温润的玉佩'
-                },
-                {
-                    'name': '灵玉',
-                    'quality': '宝品',
-                    'min_level': 15,
-                    'max_level': 25,
-                    'mp_range': (50, 80),
-                    'hp_range': (60, 100),
-                    'speed_bonus_chance': 0.3,
-                    'description': '蕴含灵力的宝玉'
-                },
-                {
-                    'name': '仙玉',
-                    'quality': '仙品',
-                    'min_level': 25,
-                    'max_level': 35,
-                    'mp_range': (100, 150),
-                    'hp_range': (120, 180),
-                    'speed_bonus_chance': 0.5,
-                    'special_effect': '法力恢复速度提升20%',
-                    'description': '仙人佩戴的宝玉'
-                }
-            ]
-        }
-
-        return templates
+        # 装备模板库（模块级常量，所有实例共享）
+        self.equipment_templates = _EQUIPMENT_TEMPLATES
 
     async def create_equipment(self, user_id: str, equipment_type: str, level: Optional[int] = None) -> Equipment:
         """
@@ -192,25 +298,22 @@ class EquipmentSystem:
         if equipment_type not in self.equipment_templates:
             raise ValueError(f"不支持的装备类型: {equipment_type}")
 
-        # 选择合适的模板
-        available_templates = [
-            template for template in self.equipment_templates[equipment_type]
-            if template['min_level'] <= player_level
-        ]
+        # 选择合适的模板（模板按最低等级有序，前 count 个即为可用模板）
+        count = bisect_right(_TEMPLATE_MIN_LEVELS[equipment_type], player_level)
+        available_templates = self.equipment_templates[equipment_type][:count]
 
         if not available_templates:
             # 如果没有合适的模板，使用最低级的
             template = self.equipment_templates[equipment_type][0]
         else:
             # 根据玩家等级权重选择模板
-            weights = []
-            for template in available_templates:
-                # 等级越接近玩家等级，权重越高
-                level_diff = abs(template['min_level'] - player_level)
-                weight = max(1, 10 - level_diff)
-                weights.append(weight)
+            # 等级越接近玩家等级，权重越高
+            weights = [
+                max(1, 10 - abs(min_level - player_level))
+                for min_level in _TEMPLATE_MIN_LEVELS[equipment_type][:count]
+            ]
 
-            template = random.choices(available_templates, weights=weights)[0]
+            template = _rng.choices(available_templates, weights=weights)[0]
 
         # 生成装备
         equipment = self._generate_equipment_from_template(template, user_id, level or player_level)
@@ -224,8 +327,11 @@ class EquipmentSystem:
 
     def _generate_equipment_from_template(self, template: Dict, user_id: str, level: int) -> Equipment:
         """从模板生成装备"""
+        randint = _rng.randint
+        rand = _rng.random
+
         equipment = Equipment(
-            id=str(uuid.uuid4()),
+            id=uuid.uuid4().hex,
             user_id=user_id,
             name=template['name'],
             type=template.get('type', 'weapon'),
@@ -241,13 +347,13 @@ class EquipmentSystem:
 
         # 生成基础属性
         if 'attack_range' in template:
-            equipment.attack = random.randint(*template['attack_range'])
+            equipment.attack = randint(*template['attack_range'])
         if 'defense_range' in template:
-            equipment.defense = random.randint(*template['defense_range'])
+            equipment.defense = randint(*template['defense_range'])
         if 'hp_range' in template:
-            equipment.hp_bonus = random.randint(*template['hp_range'])
+            equipment.hp_bonus = randint(*template['hp_range'])
         if 'mp_range' in template:
-            equipment.mp_bonus = random.randint(*template['mp_range'])
+            equipment.mp_bonus = randint(*template['mp_range'])
 
         # 根据等级调整属性
         if level > template['min_level']:
@@ -258,15 +364,15 @@ class EquipmentSystem:
             equipment.mp_bonus = int(equipment.mp_bonus * level_multiplier)
 
         # 额外属性
-        if template.get('crit_rate_chance', 0) > 0 and random.random() < template['crit_rate_chance']:
+        if template.get('crit_rate_chance', 0) > 0 and rand() < template['crit_rate_chance']:
             equipment.extra_attrs = equipment.extra_attrs or {}
             equipment.extra_attrs['crit_rate'] = 0.05  # 5%暴击率
 
-        if template.get('dodge_rate_chance', 0) > 0 and random.random() < template['dodge_rate_chance']:
+        if template.get('dodge_rate_chance', 0) > 0 and rand() < template['dodge_rate_chance']:
             equipment.extra_attrs = equipment.extra_attrs or {}
             equipment.extra_attrs['dodge_rate'] = 0.05  # 5%闪避率
 
-        if template.get('speed_bonus_chance', 0) > 0 and random.random() < template['speed_bonus_chance']:
+        if template.get('speed_bonus_chance', 0) > 0 and rand() < template['speed_bonus_chance']:
             equipment.extra_attrs = equipment.extra_attrs or {}
             equipment.extra_attrs['speed_bonus'] = 5  # 5点速度
 
@@ -275,37 +381,47 @@ class EquipmentSystem:
     def _get_player_level(self, player) -> int:
         """获取玩家等级(基于境界的简化计算)"""
         # 根据境界和等级计算一个综合等级
-        realm_levels = {
-            '炼气期': 1,
-            '筑基期': 10,
-            '金丹期': 20,
-            '元婴期': 30,
-            '化神期': 40,
-            '炼虚期': 50,
-            '合体期': 60,
-            '大乘期': 70,
-            '渡劫期': 80
-        }
-
-        base_level = realm_levels.get(player.realm, 1)
+        base_level = _REALM_BASE_LEVELS.get(player.realm, 1)
         return base_level + player.realm_level - 1
 
     async def _save_equipment(self, equipment: Equipment):
         """保存装备到数据库"""
+        await self.save_equipment_batch([equipment])
+
+    async def save_equipment_batch(self, equipments: List[Equipment]):
+        """
+        批量保存装备到数据库（一次事务、一次提交）
+
+        Args:
+            equipments: 装备列表
+        """
+        if not equipments:
+            return
+
         # 确保装备表存在
         await self._ensure_equipment_table()
 
-        # 插入装备数据
-        equipment_data = equipment.to_dict()
-        columns = list(equipment_data.keys())
-        placeholders = ', '.join(['?' for _ in columns])
-        values = list(equipment_data.values())
+        await self.db.execute_many(
+            _INSERT_EQUIPMENT_SQL,
+            [equipment.to_row() for equipment in equipments]
+        )
+        self.invalidate_equipment_cache(*{equipment.user_id for equipment in equipments})
 
-        sql = f"INSERT INTO equipment ({', '.join(columns)}) VALUES ({placeholders})"
-        await self.db.execute(sql, values)
+    def invalidate_equipment_cache(self, *user_ids: str):
+        """
+        使玩家装备列表缓存失效
+
+        Args:
+            user_ids: 装备发生变化的用户ID
+        """
+        for user_id in user_ids:
+            self._equipment_cache.pop(user_id, None)
 
     async def _ensure_equipment_table(self):
-        """确保装备表存在"""
+        """确保装备表存在（每个实例只执行一次；读取路径依赖 init_db 已建好的表）"""
+        if self._table_ready:
+            return
+
         sql = """
         CREATE TABLE IF NOT EXISTS equipment (
             id TEXT PRIMARY KEY,
@@ -329,38 +445,62 @@ class EquipmentSystem:
         )
         """
         await self.db.execute(sql)
+        self._table_ready = True
 
     async def get_player_equipment(self, user_id: str) -> List[Equipment]:
-        """获取玩家的所有装备"""
-        await self._ensure_equipment_table()
+        """获取玩家的所有装备（按创建时间倒序，短时间内的重复查询直接读缓存）"""
+        cache = self._equipment_cache
+        cached = cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return [Equipment.from_row(result) for result in cached[1]]
 
         results = await self.db.fetchall(
-            "SELECT * FROM equipment WHERE user_id = ? ORDER BY created_at DESC",
+            f"{_SELECT_EQUIPMENT_SQL} WHERE user_id = ? ORDER BY created_at DESC",
             (user_id,)
         )
 
-        equipment_list = []
-        for result in results:
-            equipment_data = dict(result)
-            equipment = Equipment.from_dict(equipment_data)
-            equipment_list.append(equipment)
-
-        return equipment_list
+        cache.pop(user_id, None)
+        cache[user_id] = (time.monotonic() + _EQUIPMENT_CACHE_TTL, results)
+        if len(cache) > _EQUIPMENT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return [Equipment.from_row(result) for result in results]
 
     async def get_equipment_by_id(self, equipment_id: str, user_id: str) -> Equipment:
         """根据ID获取装备"""
-        await self._ensure_equipment_table()
-
         result = await self.db.fetchone(
-            "SELECT * FROM equipment WHERE id = ? AND user_id = ?",
+            f"{_SELECT_EQUIPMENT_SQL} WHERE id = ? AND user_id = ?",
             (equipment_id, user_id)
         )
 
         if result is None:
             raise EquipmentNotFoundError(equipment_id)
 
-        equipment_data = dict(result)
-        return Equipment.from_dict(equipment_data)
+        return Equipment.from_row(result)
+
+    async def get_equipment_by_ids(self, equipment_ids: List[str], user_id: str) -> Dict[str, Equipment]:
+        """
+        根据ID批量获取装备（每批一条查询）
+
+        Args:
+            equipment_ids: 装备ID列表
+            user_id: 用户ID
+
+        Returns:
+            {装备ID: 装备}，不存在或不属于该玩家的ID不出现在结果中
+        """
+        ids = list(dict.fromkeys(equipment_ids))
+        equipment_map: Dict[str, Equipment] = {}
+        for start in range(0, len(ids), _ID_BATCH_SIZE):
+            batch = ids[start:start + _ID_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            results = await self.db.fetchall(
+                f"{_SELECT_EQUIPMENT_SQL} WHERE user_id = ? AND id IN ({placeholders})",
+                (user_id, *batch)
+            )
+            for result in results:
+                equipment = Equipment.from_row(result)
+                equipment_map[equipment.id] = equipment
+        return equipment_map
 
     async def equip_item(self, user_id: str, equipment_id: str) -> Equipment:
         """装备物品"""
@@ -373,17 +513,19 @@ class EquipmentSystem:
         if not equipment.can_enhance():  # 这里用can_enhance来检查等级要求
             raise InsufficientLevelError(equipment.level)
 
-        # 检查是否已有同类型装备
-        current_equipment = await self.get_player_equipment(user_id)
-        for item in current_equipment:
-            if item.is_equipped and item.type == equipment.type:
-                # 卸下当前装备
-                item.unequip()
-                await self._update_equipment(item)
-
-        # 装备新物品
-        equipment.equip(equipment.get_slot())
-        await self._update_equipment(equipment)
+        # 卸下同类型的其他装备并穿上新装备：两条定向 UPDATE，同一事务内完成，无需读取整个背包
+        async with self.db.transaction():
+            await self.db.execute(
+                "UPDATE equipment SET is_equipped = 0 "
+                "WHERE user_id = ? AND type = ? AND is_equipped = 1 AND id != ?",
+                (user_id, equipment.type, equipment.id)
+            )
+            await self.db.execute(
+                "UPDATE equipment SET is_equipped = 1 WHERE id = ?",
+                (equipment.id,)
+            )
+        equipment.is_equipped = True
+        self.invalidate_equipment_cache(user_id)
 
         logger.info(f"玩家 {player.name} 装备了: {equipment.get_display_name()}")
 
@@ -391,38 +533,66 @@ class EquipmentSystem:
 
     async def unequip_item(self, user_id: str, slot: str) -> Equipment:
         """卸下装备"""
-        # 获取当前装备的物品
-        current_equipment = await self.get_player_equipment(user_id)
-        equipped_item = None
+        # 槽位既可以是中文名（武器）也可以是装备类型（weapon）
+        equipment_type = self._slot_types.get(slot, slot)
 
-        for item in current_equipment:
-            if item.is_equipped and item.get_slot() == slot:
-                equipped_item = item
-                break
+        # 只查询该槽位上已穿戴的那一件
+        result = await self.db.fetchone(
+            f"{_SELECT_EQUIPMENT_SQL} WHERE user_id = ? AND type = ? AND is_equipped = 1 LIMIT 1",
+            (user_id, equipment_type)
+        )
 
-        if equipped_item is None:
+        if result is None:
             raise EquipmentNotFoundError(f"槽位 {slot} 没有装备")
 
         # 卸下装备
-        equipped_item.unequip()
-        await self._update_equipment(equipped_item)
+        equipped_item = Equipment.from_row(result)
+        await self.db.execute(
+            "UPDATE equipment SET is_equipped = 0 WHERE id = ?",
+            (equipped_item.id,)
+        )
+        equipped_item.is_equipped = False
+        self.invalidate_equipment_cache(user_id)
 
         player = await self.player_mgr.get_player_or_error(user_id)
         logger.info(f"玩家 {player.name} 卸下了: {equipped_item.get_display_name()}")
 
         return equipped_item
 
-    async def _update_equipment(self, equipment: Equipment):
+    async def update_equipment(self, equipment: Equipment):
         """更新装备信息"""
-        equipment_data = equipment.to_dict()
+        await self.db.execute(_UPDATE_EQUIPMENT_SQL, equipment.to_row()[1:] + (equipment.id,))
+        self.invalidate_equipment_cache(equipment.user_id)
 
-        # 构建UPDATE语句
-        set_clause = ', '.join([f"{key} = ?" for key in equipment_data.keys() if key != 'id'])
-        values = [value for key, value in equipment_data.items() if key != 'id']
-        values.append(equipment.id)
+    async def set_enhance_level(self, user_id: str, equipment_id: str, enhance_level: int):
+        """
+        设置装备强化等级
 
-        sql = f"UPDATE equipment SET {set_clause} WHERE id = ?"
-        await self.db.execute(sql, tuple(values))
+        Args:
+            user_id: 装备所属用户ID
+            equipment_id: 装备ID
+            enhance_level: 新的强化等级
+        """
+        await self.db.execute(
+            "UPDATE equipment SET enhance_level = ? WHERE id = ?",
+            (enhance_level, equipment_id)
+        )
+        self.invalidate_equipment_cache(user_id)
+
+    async def transfer_equipment(self, equipment_id: str, from_user_id: str, to_user_id: str):
+        """
+        转移装备所有权
+
+        Args:
+            equipment_id: 装备ID
+            from_user_id: 原所属用户ID
+            to_user_id: 新所属用户ID
+        """
+        await self.db.execute(
+            "UPDATE equipment SET user_id = ? WHERE id = ?",
+            (to_user_id, equipment_id)
+        )
+        self.invalidate_equipment_cache(from_user_id, to_user_id)
 
     async def get_equipped_items(self, user_id: str) -> Dict[str, Equipment]:
         """获取玩家已装备的物品"""
@@ -438,58 +608,54 @@ class EquipmentSystem:
     async def format_equipment_list(self, user_id: str) -> str:
         """格式化装备列表"""
         equipment_list = await self.get_player_equipment(user_id)
-        equipped_items = await self.get_equipped_items(user_id)
 
         if not equipment_list:
             return "📦 背包空空如也，还没有任何装备"
 
-        lines = ["🎒 装备背包", "─" * 40]
-
-        # 按类型分组显示
-        by_type = {}
-        for item in equipment_list:
-            if item.type not in by_type:
-                by_type[item.type] = []
-            by_type[item.type].append(item)
-
-        type_names = {
-            'weapon': '⚔️ 武器',
-            'armor': '🛡️ 护甲',
-            'accessory': '💍 饰品'
-        }
+        lines = ["🎒 装备背包", _DIVIDER]
 
-        for equip_type, items in by_type.items():
-            type_name = type_names.get(equip_type, f"📦 {equip_type}")
+        # 按类型分组显示（稳定排序，同类型内保持创建时间倒序）
+        by_type = sorted(equipment_list, key=attrgetter('type'))
+        for equip_type, items in groupby(by_type, key=attrgetter('type')):
+            type_name = _TYPE_LABELS.get(equip_type) or f"📦 {equip_type}"
             lines.append(f"\n{type_name}:")
-
-            for i, item in enumerate(items, 1):
-                status = "✅" if item.is_equipped else "⭕"
-                lines.append(f"  {status} {i}. {item.get_display_name()}")
+            lines.extend(
+                f"  {_EQUIPPED_MARKS[item.is_equipped]} {i}. {item.get_display_name()}"
+                for i, item in enumerate(items, 1)
+            )
 
         lines.append("\n💡 使用 /装备 [编号] 穿戴装备")
         lines.append("💡 使用 /卸下 [槽位] 卸下装备")
 
         return "\n".join(lines)
 
-    async def get_equipment_stats(self, user_id: str) -> Dict:
-        """获取装备统计信息"""
-        equipped_items = await self.get_equipped_items(user_id)
+    async def get_equipment_stats(self, user_id: str, with_items: bool = False) -> Dict:
+        """
+        获取装备统计信息
+
+        Args:
+            user_id: 用户ID
+            with_items: 是否同时返回已装备物品对象（需要额外一次查询）
 
-        total_attack = sum(item.get_total_attack() for item in equipped_items.values())
-        total_defense = sum(item.get_total_defense() for item in equipped_items.values())
-        total_hp = sum(item.hp_bonus for item in equipped_items.values())
-        total_mp = sum(item.mp_bonus for item in equipped_items.values())
-        total_score = sum(item.get_equipment_score() for item in equipped_items.values())
+        Returns:
+            统计信息字典
+        """
+        row = await self.db.fetchone(_EQUIPMENT_STATS_SQL, (user_id,))
+        equipped_count, total_attack, total_defense, total_hp, total_mp, total_score = row[:6]
 
-        return {
-            'equipped_count': len(equipped_items),
+        stats = {
+            'equipped_count': equipped_count,
             'total_attack': total_attack,
             'total_defense': total_defense,
             'total_hp_bonus': total_hp,
             'total_mp_bonus': total_mp,
-            'total_score': total_score,
-            'equipped_items': equipped_items
+            'total_score': total_score
         }
+        # 附加属性合计：total_crit_rate / total_dodge_rate / total_speed_bonus
+        stats.update(zip((f'total_{key}' for key in _EXTRA_ATTR_KEYS), row[6:]))
+        if with_items:
+            stats['equipped_items'] = await self.get_equipped_items(user_id)
+        return stats
 
     async def enhance_equipment(self, user_id: str, equipment_id: str) -> Dict:
         """
@@ -539,7 +705,7 @@ class EquipmentSystem:
 
         # 执行强化
         old_level = equipment.enhance_level
-        success = random.random() < success_rate
+        success = _rng.random() < success_rate
 
         # 扣除灵石
         player.spirit_stone -= spirit_stone_cost
@@ -575,7 +741,7 @@ class EquipmentSystem:
                 attribute_bonus['mp_bonus'] = mp_bonus
 
             # 更新装备
-            await self._update_equipment(equipment)
+            await self.update_equipment(equipment)
 
             logger.info(
                 f"玩家 {player.name} 成功强化 {equipment.get_display_name()} "
@@ -3,16 +3,194 @@
 支持多人组队探索
 """
 
+import asyncio
 import json
+import os
+import time
 import uuid
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
 from astrbot.api import logger
 
 from .database import DatabaseManager
 from ..utils import XiuxianException
 
 
+# SQL 语句集中为模块常量：每次调用的语句文本完全相同，可直接命中连接的预编译语句缓存
+
+# 队伍查询显式列出的列（不依赖 SELECT * 的列顺序）
+_TEAM_COLUMNS = (
+    "t.id, t.leader_id, t.location_id, t.status, t.session_data, "
+    "t.created_at, t.started_at, t.finished_at"
+)
+
+# 成员查询只取调用方用到的列（不含内部使用的邀请过期时间）
+_MEMBER_COLUMNS = "id, team_id, user_id, status, joined_at"
+
+_INSERT_TEAM_SQL = """
+    INSERT INTO exploration_teams (
+        id, leader_id, location_id, status
+    ) VALUES (?, ?, ?, 'waiting')
+"""
+
+_INSERT_LEADER_SQL = """
+    INSERT INTO team_members (
+        team_id, user_id, status, joined_at
+    ) VALUES (?, ?, 'joined', ?)
+"""
+
+# 邀请的过期时间（Unix 秒）保存在 team_members.expires_at 中；已过期但尚未清理的
+# 邀请在各查询中按未邀请处理
+_DELETE_TEAM_EXPIRED_INVITES_SQL = """
+    DELETE FROM team_members
+    WHERE team_id = ? AND status = 'invited' AND expires_at <= ?
+"""
+
+_DELETE_EXPIRED_INVITES_SQL = """
+    DELETE FROM team_members
+    WHERE status = 'invited' AND expires_at <= ?
+"""
+
+# 邀请前的校验一次查出：队长、队伍状态、当前人数、被邀请者是否已在队伍中
+_INVITE_CHECK_SQL = """
+    SELECT t.leader_id, t.status,
+           (SELECT COUNT(*) FROM team_members WHERE team_id = t.id) AS member_count,
+           EXISTS(
+               SELECT 1 FROM team_members WHERE team_id = t.id AND user_id = ?
+           ) AS already_member
+    FROM exploration_teams t
+    WHERE t.id = ?
+"""
+
+_INSERT_INVITE_SQL = """
+    INSERT INTO team_members (
+        team_id, user_id, status, expires_at
+    ) VALUES (?, ?, 'invited', ?)
+"""
+
+_DELETE_INVITE_SQL = """
+    DELETE FROM team_members
+    WHERE team_id = ? AND user_id = ? AND status = 'invited'
+"""
+
+_ACCEPT_INVITE_SQL = """
+    UPDATE team_members
+    SET status = 'joined', joined_at = ?
+    WHERE team_id = ? AND user_id = ? AND status = 'invited' AND expires_at > ?
+"""
+
+_SELECT_TEAM_SQL = f"""
+    SELECT {_TEAM_COLUMNS} FROM exploration_teams t
+    WHERE t.id = ?
+"""
+
+_SELECT_MEMBERS_SQL = f"""
+    SELECT {_MEMBER_COLUMNS} FROM team_members
+    WHERE team_id = ? AND (status != 'invited' OR expires_at > ?)
+    ORDER BY joined_at
+"""
+
+_SELECT_MEMBERS_BY_STATUS_SQL = f"""
+    SELECT {_MEMBER_COLUMNS} FROM team_members
+    WHERE team_id = ? AND status = ? AND (status != 'invited' OR expires_at > ?)
+    ORDER BY joined_at
+"""
+
+_SELECT_PLAYER_INVITES_SQL = f"""
+    SELECT {_TEAM_COLUMNS}, tm.id as member_id
+    FROM exploration_teams t
+    JOIN team_members tm ON t.id = tm.team_id
+    WHERE tm.user_id = ? AND tm.status = 'invited' AND tm.expires_at > ?
+      AND t.status = 'waiting'
+    ORDER BY t.created_at DESC
+"""
+
+_START_TEAM_SQL = """
+    UPDATE exploration_teams
+    SET status = 'active', started_at = ?
+    WHERE id = ?
+"""
+
+_FINISH_TEAM_SQL = """
+    UPDATE exploration_teams
+    SET status = 'finished', finished_at = ?
+    WHERE id = ?
+"""
+
+_DELETE_TEAM_MEMBERS_SQL = "DELETE FROM team_members WHERE team_id = ?"
+
+# 只有队长可以解散队伍：队长条件直接放进 DELETE，按影响行数判断是否成功
+_DELETE_TEAM_SQL = "DELETE FROM exploration_teams WHERE id = ? AND leader_id = ?"
+
+_DELETE_MEMBER_SQL = """
+    DELETE FROM team_members
+    WHERE team_id = ? AND user_id = ?
+"""
+
+_SELECT_PLAYER_ACTIVE_TEAM_SQL = f"""
+    SELECT {_TEAM_COLUMNS} FROM exploration_teams t
+    JOIN team_members tm ON t.id = tm.team_id
+    WHERE tm.user_id = ? AND tm.status = 'joined'
+      AND t.status IN ('waiting', 'active')
+    ORDER BY t.created_at DESC
+    LIMIT 1
+"""
+
+
+# 队伍ID随机字节缓冲：每次从系统随机源取一整块，按 16 字节切分使用，
+# 集中组队时不必每个队伍都调用一次 os.urandom
+_UUID_BUFFER_SIZE = 4096
+_uuid_buffer = b""
+_uuid_offset = _UUID_BUFFER_SIZE
+
+
+def _fast_uuid() -> str:
+    """
+    从随机字节缓冲生成 UUID4 字符串
+
+    Returns:
+        与 str(uuid.uuid4()) 格式相同的UUID字符串
+    """
+    global _uuid_buffer, _uuid_offset
+    if _uuid_offset >= _UUID_BUFFER_SIZE:
+        _uuid_buffer = os.urandom(_UUID_BUFFER_SIZE)
+        _uuid_offset = 0
+    chunk = _uuid_buffer[_uuid_offset:_uuid_offset + 16]
+    _uuid_offset += 16
+    return str(uuid.UUID(bytes=chunk, version=4))
+
+
+# 邀请有效期（秒）
+_INVITE_TTL = 30
+
+# 后台清理过期邀请的间隔（秒）；查询本身会过滤过期邀请，清理只用于回收行
+_INVITE_SWEEP_INTERVAL = 15.0
+
+# 玩家活跃队伍缓存：有效期（秒）和最多缓存的玩家数（超出时淘汰最早写入的）；
+# 本模块内改变队伍归属或状态的写入会立即让相关缓存失效
+_ACTIVE_TEAM_CACHE_TTL = 5.0
+_ACTIVE_TEAM_CACHE_SIZE = 1024
+
+
+def _row_to_team(row) -> Optional[Dict]:
+    """
+    将队伍查询结果转换为字典（session_data 为空时不解析 JSON）
+
+    Args:
+        row: 队伍查询结果
+
+    Returns:
+        队伍信息，无结果时为 None
+    """
+    if not row:
+        return None
+    team = dict(row)
+    if team['session_data']:
+        team['session_data'] = json.loads(team['session_data'])
+    return team
+
+
 class ExplorationTeamError(XiuxianException):
     """探索队伍相关异常"""
     pass
@@ -23,8 +201,30 @@ class ExplorationTeamManager:
 
     def __init__(self, db: DatabaseManager):
         self.db = db
-        # 内存中的邀请数据 {team_id: {user_id: expire_time}}
-        self._pending_invites = {}
+        # 后台过期邀请清理任务（第一次邀请时启动）
+        self._invite_sweeper: Optional[asyncio.Task] = None
+        # 玩家活跃队伍缓存 {user_id: (过期时间, 查询结果行或 None)}；缓存不可变的数据行，
+        # 每次命中都重新构造字典（包括 session_data），调用方修改返回值不会影响缓存
+        self._active_team_cache: "OrderedDict[str, Tuple[float, Optional[Any]]]" = OrderedDict()
+
+    def _invalidate_active_team(self, *user_ids: str, team_id: Optional[str] = None):
+        """
+        使玩家活跃队伍缓存失效
+
+        Args:
+            user_ids: 玩家ID
+            team_id: 队伍ID（缓存中属于该队伍的玩家全部失效）
+        """
+        cache = self._active_team_cache
+        for user_id in user_ids:
+            cache.pop(user_id, None)
+        if team_id is not None:
+            stale = [
+                user_id for user_id, (_, row) in cache.items()
+                if row is not None and row['id'] == team_id
+            ]
+            for user_id in stale:
+                del cache[user_id]
 
     async def create_team(self, leader_id: str, location_id: int) -> str:
         """
@@ -37,22 +237,18 @@ class ExplorationTeamManager:
         Returns:
             队伍ID
         """
-        team_id = str(uuid.uuid4())
+        team_id = _fast_uuid()
 
-        await self.db.execute("""
-            INSERT INTO exploration_teams (
-                id, leader_id, location_id, status
-            ) VALUES (?, ?, ?, 'waiting')
-        """, (team_id, leader_id, location_id))
+        await self.db.execute_write(_INSERT_TEAM_SQL, (team_id, leader_id, location_id))
 
         # 添加队长作为成员
-        await self.db.execute("""
-            INSERT INTO team_members (
-                team_id, user_id, status, joined_at
-            ) VALUES (?, ?, 'joined', ?)
-        """, (team_id, leader_id, datetime.now().isoformat()))
+        await self.db.execute_write(
+            _INSERT_LEADER_SQL, (team_id, leader_id, datetime.now().isoformat())
+        )
+
+        self._invalidate_active_team(leader_id)
 
-        logger.info(f"创建探索队伍: {team_id}, 队长: {leader_id}")
+        logger.info("创建探索队伍: %s, 队长: %s", team_id, leader_id)
         return team_id
 
     async def invite_member(self, team_id: str, user_id: str, inviter_id: str) -> bool:
@@ -67,47 +263,64 @@ class ExplorationTeamManager:
         Returns:
             是否成功邀请
         """
+        # 清理本队过期邀请、校验与写入邀请记录在同一个事务中完成
+        now = int(time.time())
+        error = None
+        try:
+            async with self.db.transaction("IMMEDIATE") as conn:
+                await conn.execute(_DELETE_TEAM_EXPIRED_INVITES_SQL, (team_id, now))
+                async with conn.execute(_INVITE_CHECK_SQL, (user_id, team_id)) as cursor:
+                    row = await cursor.fetchone()
+                error = self._check_invite(row, inviter_id)
+                if error is None:
+                    await conn.execute(
+                        _INSERT_INVITE_SQL, (team_id, user_id, now + _INVITE_TTL)
+                    )
+        except Exception as e:
+            logger.error("邀请成员失败: %s", e)
+            return False
+
+        if error:
+            raise ExplorationTeamError(error)
+
+        self._ensure_invite_sweeper()
+
+        logger.info("邀请玩家 %s 加入队伍 %s", user_id, team_id)
+        return True
+
+    @staticmethod
+    def _check_invite(row, inviter_id: str) -> Optional[str]:
+        """
+        根据邀请校验查询结果判断能否邀请
+
+        Args:
+            row: _INVITE_CHECK_SQL 的查询结果
+            inviter_id: 邀请者ID
+
+        Returns:
+            不能邀请时的错误信息，可以邀请时为 None
+        """
         # 检查队伍是否存在
-        team = await self.get_team(team_id)
-        if not team:
-            raise ExplorationTeamError("队伍不存在")
+        if not row:
+            return "队伍不存在"
 
         # 检查队伍状态
-        if team['status'] != 'waiting':
-            raise ExplorationTeamError("队伍已经开始探索或已结束")
+        if row['status'] != 'waiting':
+            return "队伍已经开始探索或已结束"
 
         # 检查邀请者是否是队长
-        if team['leader_id'] != inviter_id:
-            raise ExplorationTeamError("只有队长可以邀请成员")
+        if row['leader_id'] != inviter_id:
+            return "只有队长可以邀请成员"
 
         # 检查成员是否已在队伍中
-        members = await self.get_team_members(team_id)
-        if user_id in [m['user_id'] for m in members]:
-            raise ExplorationTeamError("该玩家已在队伍中")
+        if row['already_member']:
+            return "该玩家已在队伍中"
 
         # 检查队伍人数限制（最多5人）
-        if len(members) >= 5:
-            raise ExplorationTeamError("队伍已满（最多5人）")
-
-        # 添加邀请记录
-        try:
-            await self.db.execute("""
-                INSERT INTO team_members (
-                    team_id, user_id, status
-                ) VALUES (?, ?, 'invited')
-            """, (team_id, user_id))
-
-            # 设置邀请过期时间（30秒）
-            if team_id not in self._pending_invites:
-                self._pending_invites[team_id] = {}
-            self._pending_invites[team_id][user_id] = datetime.now() + timedelta(seconds=30)
+        if row['member_count'] >= 5:
+            return "队伍已满（最多5人）"
 
-            logger.info(f"邀请玩家 {user_id} 加入队伍 {team_id}")
-            return True
-
-        except Exception as e:
-            logger.error(f"邀请成员失败: {e}")
-            return False
+        return None
 
     async def accept_invite(self, team_id: str, user_id: str) -> bool:
         """
@@ -120,29 +333,18 @@ class ExplorationTeamManager:
         Returns:
             是否成功接受
         """
-        # 检查邀请是否过期
-        if team_id in self._pending_invites and user_id in self._pending_invites[team_id]:
-            if datetime.now() > self._pending_invites[team_id][user_id]:
-                # 邀请已过期
-                await self.db.execute("""
-                    DELETE FROM team_members
-                    WHERE team_id = ? AND user_id = ? AND status = 'invited'
-                """, (team_id, user_id))
-                del self._pending_invites[team_id][user_id]
-                raise ExplorationTeamError("邀请已过期")
-
-        # 更新成员状态
-        await self.db.execute("""
-            UPDATE team_members
-            SET status = 'joined', joined_at = ?
-            WHERE team_id = ? AND user_id = ? AND status = 'invited'
-        """, (datetime.now().isoformat(), team_id, user_id))
-
-        # 清除邀请记录
-        if team_id in self._pending_invites and user_id in self._pending_invites[team_id]:
-            del self._pending_invites[team_id][user_id]
-
-        logger.info(f"玩家 {user_id} 加入队伍 {team_id}")
+        # 更新成员状态（只更新仍处于邀请状态且未过期的记录，已拒绝/已过期的邀请不会被接受）
+        updated = await self.db.execute_write(
+            _ACCEPT_INVITE_SQL,
+            (datetime.now().isoformat(), team_id, user_id, int(time.time()))
+        )
+
+        if not updated:
+            raise ExplorationTeamError("邀请不存在或已过期")
+
+        self._invalidate_active_team(user_id)
+
+        logger.info("玩家 %s 加入队伍 %s", user_id, team_id)
         return True
 
     async def reject_invite(self, team_id: str, user_id: str):
@@ -153,16 +355,11 @@ class ExplorationTeamManager:
             team_id: 队伍ID
             user_id: 玩家ID
         """
-        await self.db.execute("""
-            DELETE FROM team_members
-            WHERE team_id = ? AND user_id = ? AND status = 'invited'
-        """, (team_id, user_id))
-
-        # 清除邀请记录
-        if team_id in self._pending_invites and user_id in self._pending_invites[team_id]:
-            del self._pending_invites[team_id][user_id]
+        deleted = await self.db.execute_write(_DELETE_INVITE_SQL, (team_id, user_id))
+        if not deleted:
+            raise ExplorationTeamError("邀请不存在或已过期")
 
-        logger.info(f"玩家 {user_id} 拒绝加入队伍 {team_id}")
+        logger.info("玩家 %s 拒绝加入队伍 %s", user_id, team_id)
 
     async def get_team(self, team_id: str) -> Optional[Dict]:
         """
@@ -174,18 +371,8 @@ class ExplorationTeamManager:
         Returns:
             队伍信息
         """
-        cursor = await self.db.execute("""
-            SELECT * FROM exploration_teams
-            WHERE id = ?
-        """, (team_id,))
-
-        row = await cursor.fetchone()
-        if row:
-            team = dict(row)
-            if team.get('session_data'):
-                team['session_data'] = json.loads(team['session_data'])
-            return team
-        return None
+        row = await self.db.fetchone(_SELECT_TEAM_SQL, (team_id,))
+        return _row_to_team(row)
 
     async def get_team_members(self, team_id: str, status: Optional[str] = None) -> List[Dict]:
         """
@@ -198,20 +385,12 @@ class ExplorationTeamManager:
         Returns:
             成员列表
         """
+        now = int(time.time())
         if status:
-            cursor = await self.db.execute("""
-                SELECT * FROM team_members
-                WHERE team_id = ? AND status = ?
-                ORDER BY joined_at
-            """, (team_id, status))
+            rows = await self.db.fetchall(_SELECT_MEMBERS_BY_STATUS_SQL, (team_id, status, now))
         else:
-            cursor = await self.db.execute("""
-                SELECT * FROM team_members
-                WHERE team_id = ?
-                ORDER BY joined_at
-            """, (team_id,))
+            rows = await self.db.fetchall(_SELECT_MEMBERS_SQL, (team_id, now))
 
-        rows = await cursor.fetchall()
         return [dict(row) for row in rows]
 
     async def get_player_invites(self, user_id: str) -> List[Dict]:
@@ -224,18 +403,7 @@ class ExplorationTeamManager:
         Returns:
             邀请列表
         """
-        # 清理过期邀请
-        await self._clean_expired_invites()
-
-        cursor = await self.db.execute("""
-            SELECT t.*, tm.id as member_id
-            FROM exploration_teams t
-            JOIN team_members tm ON t.id = tm.team_id
-            WHERE tm.user_id = ? AND tm.status = 'invited' AND t.status = 'waiting'
-            ORDER BY t.created_at DESC
-        """, (user_id,))
-
-        rows = await cursor.fetchall()
+        rows = await self.db.fetchall(_SELECT_PLAYER_INVITES_SQL, (user_id, int(time.time())))
         return [dict(row) for row in rows]
 
     async def start_team_exploration(self, team_id: str) -> bool:
@@ -249,13 +417,10 @@ class ExplorationTeamManager:
             是否成功开始
         """
         # 更新队伍状态
-        await self.db.execute("""
-            UPDATE exploration_teams
-            SET status = 'active', started_at = ?
-            WHERE id = ?
-        """, (datetime.now().isoformat(), team_id))
+        await self.db.execute_write(_START_TEAM_SQL, (datetime.now().isoformat(), team_id))
+        self._invalidate_active_team(team_id=team_id)
 
-        logger.info(f"队伍 {team_id} 开始探索")
+        logger.info("队伍 %s 开始探索", team_id)
         return True
 
     async def finish_team_exploration(self, team_id: str):
@@ -265,13 +430,10 @@ class ExplorationTeamManager:
         Args:
             team_id: 队伍ID
         """
-        await self.db.execute("""
-            UPDATE exploration_teams
-            SET status = 'finished', finished_at = ?
-            WHERE id = ?
-        """, (datetime.now().isoformat(), team_id))
+        await self.db.execute_write(_FINISH_TEAM_SQL, (datetime.now().isoformat(), team_id))
+        self._invalidate_active_team(team_id=team_id)
 
-        logger.info(f"队伍 {team_id} 探索结束")
+        logger.info("队伍 %s 探索结束", team_id)
 
     async def disband_team(self, team_id: str, disbander_id: str):
         """
@@ -281,25 +443,23 @@ class ExplorationTeamManager:
             team_id: 队伍ID
             disbander_id: 解散者ID
         """
-        team = await self.get_team(team_id)
-        if not team:
-            raise ExplorationTeamError("队伍不存在")
-
-        # 只有队长可以解散队伍（或者所有成员都离开）
-        if team['leader_id'] != disbander_id:
+        # 删除队伍和队伍成员在同一个事务中完成
+        async with self.db.transaction("IMMEDIATE") as conn:
+            async with conn.execute(_DELETE_TEAM_SQL, (team_id, disbander_id)) as cursor:
+                deleted = cursor.rowcount
+            if deleted:
+                await conn.execute(_DELETE_TEAM_MEMBERS_SQL, (team_id,))
+
+        if not deleted:
+            # 未删除任何行：区分队伍不存在和非队长操作
+            if not await self.get_team(team_id):
+                raise ExplorationTeamError("队伍不存在")
+            # 只有队长可以解散队伍（或者所有成员都离开）
             raise ExplorationTeamError("只有队长可以解散队伍")
 
-        # 删除队伍成员
-        await self.db.execute("DELETE FROM team_members WHERE team_id = ?", (team_id,))
-
-        # 删除队伍
-        await self.db.execute("DELETE FROM exploration_teams WHERE id = ?", (team_id,))
-
-        # 清除邀请记录
-        if team_id in self._pending_invites:
-            del self._pending_invites[team_id]
+        self._invalidate_active_team(team_id=team_id)
 
-        logger.info(f"队伍 {team_id} 已解散")
+        logger.info("队伍 %s 已解散", team_id)
 
     async def leave_team(self, team_id: str, user_id: str):
         """
@@ -319,37 +479,40 @@ class ExplorationTeamManager:
             return
 
         # 删除成员记录
-        await self.db.execute("""
-            DELETE FROM team_members
-            WHERE team_id = ? AND user_id = ?
-        """, (team_id, user_id))
+        await self.db.execute_write(_DELETE_MEMBER_SQL, (team_id, user_id))
+        self._invalidate_active_team(user_id)
 
-        logger.info(f"玩家 {user_id} 离开队伍 {team_id}")
+        logger.info("玩家 %s 离开队伍 %s", user_id, team_id)
+
+    def _ensure_invite_sweeper(self):
+        """在有邀请产生后启动后台过期邀请清理任务（只启动一次）"""
+        if self._invite_sweeper is None or self._invite_sweeper.done():
+            self._invite_sweeper = asyncio.create_task(self._sweep_expired_invites())
+
+    async def _sweep_expired_invites(self):
+        """后台任务：定期清理过期邀请"""
+        while True:
+            await asyncio.sleep(_INVITE_SWEEP_INTERVAL)
+            try:
+                await self._clean_expired_invites()
+            except Exception as e:
+                logger.warning("清理过期队伍邀请失败: %s", e)
 
     async def _clean_expired_invites(self):
-        """清理过期邀请"""
-        now = datetime.now()
-        expired_teams = []
-
-        for team_id, invites in self._pending_invites.items():
-            expired_users = []
-            for user_id, expire_time in invites.items():
-                if now > expire_time:
-                    expired_users.append(user_id)
-                    # 删除过期邀请
-                    await self.db.execute("""
-                        DELETE FROM team_members
-                        WHERE team_id = ? AND user_id = ? AND status = 'invited'
-                    """, (team_id, user_id))
-
-            for user_id in expired_users:
-                del invites[user_id]
-
-            if not invites:
-                expired_teams.append(team_id)
-
-        for team_id in expired_teams:
-            del self._pending_invites[team_id]
+        """清理过期邀请（按部分索引范围删除）"""
+        deleted = await self.db.execute_write(_DELETE_EXPIRED_INVITES_SQL, (int(time.time()),))
+        if deleted:
+            logger.debug("清理过期队伍邀请 %s 条", deleted)
+
+    async def close(self):
+        """停止后台清理任务"""
+        if self._invite_sweeper:
+            self._invite_sweeper.cancel()
+            try:
+                await self._invite_sweeper
+            except asyncio.CancelledError:
+                pass
+            self._invite_sweeper = None
 
     async def get_player_active_team(self, user_id: str) -> Optional[Dict]:
         """
@@ -361,19 +524,15 @@ class ExplorationTeamManager:
         Returns:
             队伍信息（如果有）
         """
-        cursor = await self.db.execute("""
-            SELECT t.* FROM exploration_teams t
-            JOIN team_members tm ON t.id = tm.team_id
-            WHERE tm.user_id = ? AND tm.status = 'joined'
-              AND t.status IN ('waiting', 'active')
-            ORDER BY t.created_at DESC
-            LIMIT 1
-        """, (user_id,))
-
-        row = await cursor.fetchone()
-        if row:
-            team = dict(row)
-            if team.get('session_data'):
-                team['session_data'] = json.loads(team['session_data'])
-            return team
-        return None
+        cache = self._active_team_cache
+        cached = cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return _row_to_team(cached[1])
+
+        row = await self.db.fetchone(_SELECT_PLAYER_ACTIVE_TEAM_SQL, (user_id,))
+
+        cache.pop(user_id, None)
+        cache[user_id] = (time.monotonic() + _ACTIVE_TEAM_CACHE_TTL, row)
+        if len(cache) > _ACTIVE_TEAM_CACHE_SIZE:
+            cache.popitem(last=False)
+        return _row_to_team(row)
@@ -12,6 +12,7 @@ from astrbot.api import logger
 from .database import DatabaseManager
 from .player import PlayerManager
 from .items import ItemManager
+from .equipment import EquipmentSystem
 from ..utils import XiuxianException
 
 
@@ -43,7 +44,13 @@ class InsufficientSpiritStoneError(MarketError):
 class MarketSystem:
     """坊市交易系统类"""
 
-    def __init__(self, db: DatabaseManager, player_mgr: PlayerManager, item_mgr: ItemManager):
+    def __init__(
+        self,
+        db: DatabaseManager,
+        player_mgr: PlayerManager,
+        item_mgr: ItemManager,
+        equipment_sys: Optional[EquipmentSystem] = None
+    ):
         """
         初始化坊市系统
 
@@ -51,10 +58,12 @@ class MarketSystem:
             db: 数据库管理器
             player_mgr: 玩家管理器
             item_mgr: 物品管理器
+            equipment_sys: 装备系统（应传入插件共用的实例，使装备缓存在交易后失效）
         """
         self.db = db
         self.player_mgr = player_mgr
         self.item_mgr = item_mgr
+        self.equipment_sys = equipment_sys or EquipmentSystem(db, player_mgr)
 
         # 交易税率（5%）
         self.transaction_tax_rate = 0.05
@@ -764,10 +773,7 @@ class MarketSystem:
 
         if item_type == "equipment":
             # 装备类型
-            from .equipment import EquipmentSystem
-            equipment_sys = EquipmentSystem(self.db, self.player_mgr)
-
-            equipment = await equipment_sys.get_equipment_by_id(item_id, user_id)
+            equipment = await self.equipment_sys.get_equipment_by_id(item_id, user_id)
 
             # 检查装备是否已绑定
             if equipment.is_bound:
@@ -966,9 +972,8 @@ class MarketSystem:
 
             if item_type == "equipment":
                 # 转移装备所有权
-                await self.db.execute(
-                    "UPDATE equipment SET user_id = ? WHERE id = ?",
-                    (buyer_id, item_id)
+                await self.equipment_sys.transfer_equipment(
+                    item_id, listing['seller_id'], buyer_id
                 )
             elif item_type == "method":
                 # 转移功法所有权
@@ -12,6 +12,7 @@ from astrbot.api import logger
 from ..core.database import DatabaseManager
 from ..core.player import PlayerManager
 from ..core.profession import ProfessionManager, ProfessionNotFoundError
+from ..core.equipment import EquipmentSystem
 from ..utils.exceptions import PlayerNotFoundError
 
 
@@ -553,7 +554,8 @@ class RefiningSystem:
         self,
         db: DatabaseManager,
         player_mgr: PlayerManager,
-        profession_mgr: ProfessionManager
+        profession_mgr: ProfessionManager,
+        equipment_sys: Optional[EquipmentSystem] = None
     ):
         """
         初始化炼器系统
@@ -562,10 +564,12 @@ class RefiningSystem:
             db: 数据库管理器
             player_mgr: 玩家管理器
             profession_mgr: 职业管理器
+            equipment_sys: 装备系统（应传入插件共用的实例，使装备缓存在炼制/强化后失效）
         """
         self.db = db
         self.player_mgr = player_mgr
         self.profession_mgr = profession_mgr
+        self.equipment_sys = equipment_sys or EquipmentSystem(db, player_mgr)
         self.sect_sys = None  # 宗门系统（可选）
 
     def set_sect_system(self, sect_sys):
@@ -745,28 +749,16 @@ class RefiningSystem:
 
         # TODO: 添加装备到背包 (需要物品系统)
         # 这里我们可以使用现有的equipment系统创建装备
-        from ..core.equipment import EquipmentSystem
-        equipment_sys = EquipmentSystem(self.db, self.player_mgr)
-
         # 创建装备(简化处理)
-        equipment = await equipment_sys.create_equipment(user_id, equipment_type)
+        equipment = await self.equipment_sys.create_equipment(user_id, equipment_type)
         # 更新装备属性
-        await self.db.execute(
-            """
-            UPDATE equipment
-            SET name = ?, quality = ?, attack = ?, defense = ?, hp_bonus = ?, mp_bonus = ?
-            WHERE id = ?
-            """,
-            (
-                f"{quality}{blueprint['output_name']}",
-                quality,
-                final_attributes.get('attack', 0),
-                final_attributes.get('defense', 0),
-                final_attributes.get('hp_bonus', 0),
-                final_attributes.get('mp_bonus', 0),
-                equipment.id
-            )
-        )
+        equipment.name = f"{quality}{blueprint['output_name']}"
+        equipment.quality = quality
+        equipment.attack = final_attributes.get('attack', 0)
+        equipment.defense = final_attributes.get('defense', 0)
+        equipment.hp_bonus = final_attributes.get('hp_bonus', 0)
+        equipment.mp_bonus = final_attributes.get('mp_bonus', 0)
+        await self.equipment_sys.update_equipment(equipment)
 
         # 获得经验
         exp_gain = self._calculate_experience(blueprint['rank'], quality)
@@ -861,10 +853,7 @@ class RefiningSystem:
         if success:
             # 强化成功
             new_level = current_level + 1
-            await self.db.execute(
-                "UPDATE equipment SET enhance_level = ? WHERE id = ?",
-                (new_level, equipment_id)
-            )
+            await self.equipment_sys.set_enhance_level(user_id, equipment_id, new_level)
 
             # 获得经验
             exp_gain = (current_level + 1) * 20
@@ -885,10 +874,7 @@ class RefiningSystem:
             # 有几率装备等级回退
             if current_level > 0 and random.random() < 0.3:
                 new_level = max(0, current_level - 1)
-                await self.db.execute(
-                    "UPDATE equipment SET enhance_level = ? WHERE id = ?",
-                    (new_level, equipment_id)
-                )
+                await self.equipment_sys.set_enhance_level(user_id, equipment_id, new_level)
                 message = f"强化失败,装备等级从+{current_level}回退到+{new_level}"
             else:
                 message = "强化失败,装备等级未变化"
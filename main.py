@@ -210,14 +210,18 @@ class XiuxianPlugin(Star):
             logger.info("🔨 正在初始化职业系统...")
             self.profession_mgr = ProfessionManager(self.db, self.player_mgr)
             self.alchemy_sys = AlchemySystem(self.db, self.player_mgr, self.profession_mgr, self.item_mgr)
-            self.refining_sys = RefiningSystem(self.db, self.player_mgr, self.profession_mgr)
+            self.refining_sys = RefiningSystem(
+                self.db, self.player_mgr, self.profession_mgr, self.equipment_sys
+            )
             self.formation_sys = FormationSystem(self.db, self.player_mgr, self.profession_mgr)
             self.talisman_sys = TalismanSystem(self.db, self.player_mgr, self.profession_mgr, self.item_mgr)
             logger.info("✓ 职业系统初始化完成")
 
             # 初始化坊市系统
             logger.info("🏪 正在初始化坊市系统...")
-            self.market_sys = MarketSystem(self.db, self.player_mgr, self.item_mgr)
+            self.market_sys = MarketSystem(
+                self.db, self.player_mgr, self.item_mgr, self.equipment_sys
+            )
             await self.market_sys.initialize()
             logger.info("✓ 坊市系统初始化完成")
 
@@ -297,6 +301,11 @@ class XiuxianPlugin(Star):
 
     async def terminate(self):
         """插件卸载时调用"""
+        # 停止探索队伍的后台清理任务
+        team_mgr = getattr(self, 'team_mgr', None)
+        if team_mgr:
+            await team_mgr.close()
+
         # 关闭数据库连接
         if self.db and self.db.db:
             await self.db.close()
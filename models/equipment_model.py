@@ -4,10 +4,30 @@
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence, Tuple
 import json
 
 
+# 数据库列顺序（与 to_dict 的键顺序一致），from_row 按此顺序按位置读取
+EQUIPMENT_COLUMNS = (
+    "id", "user_id", "name", "type", "sub_type", "quality",
+    "level", "enhance_level", "attack", "defense", "hp_bonus", "mp_bonus",
+    "extra_attrs", "special_effect", "skill_id",
+    "is_equipped", "is_bound", "created_at"
+)
+
+# 装备评分的品质加成倍率
+QUALITY_SCORE_MULTIPLIERS = {
+    "凡品": 1.0,
+    "灵品": 1.5,
+    "宝品": 2.0,
+    "仙品": 3.0,
+    "神品": 5.0,
+    "道品": 8.0,
+    "混沌品": 10.0
+}
+
+
 @dataclass
 class Equipment:
     """装备数据模型"""
@@ -61,7 +81,7 @@ class Equipment:
             "defense": self.defense,
             "hp_bonus": self.hp_bonus,
             "mp_bonus": self.mp_bonus,
-            "extra_attrs": str(self.extra_attrs) if self.extra_attrs else None,
+            "extra_attrs": json.dumps(self.extra_attrs, ensure_ascii=False) if self.extra_attrs else None,
             "special_effect": self.special_effect,
             "skill_id": self.skill_id,
             "is_equipped": 1 if self.is_equipped else 0,
@@ -70,6 +90,22 @@ class Equipment:
         }
         return data
 
+    def to_row(self) -> Tuple[Any, ...]:
+        """
+        转换为按 EQUIPMENT_COLUMNS 顺序排列的参数元组用于数据库写入
+
+        与 to_dict 的取值一致，但不构建中间字典
+        """
+        return (
+            self.id, self.user_id, self.name, self.type, self.sub_type, self.quality,
+            self.level, self.enhance_level, self.attack, self.defense, self.hp_bonus, self.mp_bonus,
+            json.dumps(self.extra_attrs, ensure_ascii=False) if self.extra_attrs else None,
+            self.special_effect, self.skill_id,
+            1 if self.is_equipped else 0,
+            1 if self.is_bound else 0,
+            self.created_at.isoformat()
+        )
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Equipment':
         """从字典创建对象"""
@@ -80,22 +116,65 @@ class Equipment:
             data["is_bound"] = bool(data["is_bound"])
 
         # 处理datetime
-        if data.get("created_at"):
-            if isinstance(data["created_at"], str):
-                data["created_at"] = datetime.fromisoformat(data["created_at"])
-        else:
-            data["created_at"] = datetime.now()
+        data["created_at"] = cls._parse_created_at(data.get("created_at"))
 
         # 处理extra_attrs
         if data.get("extra_attrs") and isinstance(data["extra_attrs"], str):
-            import json
-            try:
-                data["extra_attrs"] = json.loads(data["extra_attrs"].replace("'", '"'))
-            except:
-                data["extra_attrs"] = None
+            data["extra_attrs"] = cls._parse_extra_attrs(data["extra_attrs"])
 
         return cls(**data)
 
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> 'Equipment':
+        """
+        从按 EQUIPMENT_COLUMNS 顺序查询的数据行创建对象
+
+        按位置读取各列，不经过中间字典
+
+        Args:
+            row: 数据行（元组或 sqlite3.Row）
+
+        Returns:
+            装备对象
+        """
+        (equipment_id, user_id, name, equipment_type, sub_type, quality,
+         level, enhance_level, attack, defense, hp_bonus, mp_bonus,
+         extra_attrs, special_effect, skill_id,
+         is_equipped, is_bound, created_at) = row
+
+        return cls(
+            equipment_id, user_id, name, equipment_type, sub_type, quality,
+            level, enhance_level, attack, defense, hp_bonus, mp_bonus,
+            cls._parse_extra_attrs(extra_attrs) if extra_attrs else None,
+            special_effect, skill_id,
+            bool(is_equipped), bool(is_bound),
+            cls._parse_created_at(created_at)
+        )
+
+    @staticmethod
+    def _parse_created_at(value: Any) -> datetime:
+        """解析数据库中的创建时间（缺失时取当前时间）"""
+        if not value:
+            return datetime.now()
+        if isinstance(value, str):
+            return datetime.fromisoformat(value)
+        return value
+
+    @staticmethod
+    def _parse_extra_attrs(value: Any) -> Optional[Dict[str, Any]]:
+        """解析数据库中的附加属性文本"""
+        if not isinstance(value, str):
+            return value
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+        # 兼容旧数据：早期以 Python 字典字面量（单引号）存储
+        try:
+            return json.loads(value.replace("'", '"'))
+        except:
+            return None
+
     def get_total_attack(self) -> int:
         """获取总攻击力(包括强化)"""
         base_attack = self.attack
@@ -187,16 +266,7 @@ class Equipment:
         score += self.enhance_level * 50
 
         # 品质加成
-        quality_bonus = {
-            "凡品": 1.0,
-            "灵品": 1.5,
-            "宝品": 2.0,
-            "仙品": 3.0,
-            "神品": 5.0,
-            "道品": 8.0,
-            "混沌品": 10.0
-        }
-        score *= quality_bonus.get(self.quality, 1.0)
+        score *= QUALITY_SCORE_MULTIPLIERS.get(self.quality, 1.0)
 
         return int(score)
 
@@ -0,0 +1,71 @@
+"""
+世界地点常量定义
+"""
+
+from typing import Any, Tuple
+
+# 初始地点数据，列顺序与 core/database.py 中的地点插入语句一致：
+# (name, description, region_type, danger_level, spirit_energy_density,
+#  min_realm, coordinates_x, coordinates_y, is_safe_zone, connected_locations)
+INITIAL_LOCATION_ROWS: Tuple[Tuple[Any, ...], ...] = (
+    (
+        "新手村",
+        "一个宁静祥和的小村落，灵气稀薄但十分安全，是众多修仙者踏上修仙之路的起点。村中有简陋的修炼场和基础的药材商铺。",
+        "city", 1, 20, "炼气期",
+        0, 0, 1, "[2,3]"
+    ),
+    (
+        "青云山",
+        "一座云雾缭绕的灵山，山间灵气充沛，适合低阶修士修炼。山中偶有低阶妖兽出没，需要小心应对。",
+        "mountain", 3, 45, "炼气期",
+        10, 20, 0, "[1,4,5]"
+    ),
+    (
+        "灵泉谷",
+        "山谷深处有一眼灵泉，常年喷涌着富含灵气的泉水。谷中药草丰茂，是采集灵药的好去处。",
+        "forest", 2, 40, "炼气期",
+        -15, 10, 0, "[1,6]"
+    ),
+    (
+        "天元城",
+        "修仙界繁华的交易中心，城中有各种店铺、拍卖行和任务大厅。城内禁止私斗，是修士们的安全港湾。",
+        "city", 1, 35, "筑基期",
+        50, 0, 1, "[2,5,7]"
+    ),
+    (
+        "紫雷峰",
+        "常年雷霆轰鸣的险峰，峰顶灵气浓郁但危机四伏。适合筑基期修士突破境界，但需警惕雷劫。",
+        "mountain", 5, 60, "筑基期",
+        30, 40, 0, "[2,4,8]"
+    ),
+    (
+        "幽暗森林",
+        "古老而神秘的原始森林，林中妖兽众多，灵药珍稀。深处传说有上古修士的洞府遗迹。",
+        "forest", 4, 50, "筑基期",
+        -30, 25, 0, "[3,9]"
+    ),
+    (
+        "碧波湖",
+        "广阔无垠的灵湖，湖水蕴含水系灵气，湖底有水晶矿脉。水系修士在此修炼事半功倍。",
+        "ocean", 3, 55, "筑基期",
+        40, -20, 0, "[4,8]"
+    ),
+    (
+        "烈焰山",
+        "终年喷发岩浆的活火山，火系灵气极为浓郁。火系修士的修炼圣地，但常人难以靠近。",
+        "mountain", 6, 70, "金丹期",
+        60, 60, 0, "[5,7,10]"
+    ),
+    (
+        "迷雾沼泽",
+        "终年笼罩在毒雾中的危险沼泽，瘴气弥漫，毒虫横行。但沼泽深处生长着珍贵的炼丹灵药。",
+        "forest", 7, 45, "金丹期",
+        -50, 50, 0, "[6,10]"
+    ),
+    (
+        "虚空裂隙",
+        "空间法则紊乱的神秘区域，时有空间风暴肆虐。传说中通往其他世界的通道，只有元婴期以上修士才敢涉足。",
+        "void", 9, 85, "元婴期",
+        100, 100, 0, "[8,9]"
+    ),
+)